@@ -0,0 +1,94 @@
+import copy
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from rest_framework.authentication import BasicAuthentication, TokenAuthentication
+
+from ..versions import bump_versions, get_version
+
+#token authentication for the API.BasicAuthentication checks the password on every request,
+#which runs the password hasher(PBKDF2,tens of milliseconds of CPU) before the view does
+#anything.a client gets a token once,with its password,from the token endpoint and sends it as
+#"Authorization: Token <key>".the token is found with a lookup on the primary key of the
+#authtoken table,and the tokens verified recently are kept in memory for
+#API_TOKEN_CACHE_SECONDS,so most requests dont query at all.
+#revoking a token bumps a version kept in the cache framework,shared by all processes.every
+#entry remembers the version it was verified with,and a request reads the current one(one cache
+#get,no query):after a revoke every process verifies its tokens again against the database,so
+#the revoked one stops working everywhere at once.a user deactivated or deleted is still
+#accepted until the entry expires
+
+
+class TokenCache(object):
+    #least recently used tokens are dropped first,entries expire after timeout seconds
+    def __init__(self, size, timeout):
+        self.size = size
+        self.timeout = timeout
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] < time.monotonic():
+                del self.entries[key]
+                return None
+            self.entries.move_to_end(key)
+            return entry[1]
+
+    def set(self, key, value):
+        with self.lock:
+            self.entries[key] = (time.monotonic() + self.timeout, value)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.size:
+                self.entries.popitem(last=False)
+
+    def delete(self, key):
+        with self.lock:
+            self.entries.pop(key, None)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+
+token_cache = TokenCache(getattr(settings, 'API_TOKEN_CACHE_SIZE', 10000),
+                         getattr(settings, 'API_TOKEN_CACHE_SECONDS', 60))
+
+
+TOKENS_VERSION_KEY = 'version:tokens'
+
+
+def cache_key(key):
+    #the keys are kept hashed,the memory of the process doesnt hold usable tokens
+    return hashlib.sha256(key.encode()).hexdigest()
+
+
+def forget_token(key):
+    token_cache.delete(cache_key(key))
+    #the other processes see the new version once the delete is committed
+    bump_versions([TOKENS_VERSION_KEY])
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    def authenticate_credentials(self, key):
+        digest = cache_key(key)
+        version = get_version(TOKENS_VERSION_KEY)
+        entry = token_cache.get(digest)
+        if entry is None or entry[0] != version:
+            #invalid tokens and inactive users raise AuthenticationFailed and arent cached
+            credentials = super(CachedTokenAuthentication, self).authenticate_credentials(key)
+            entry = (version,) + credentials
+            token_cache.set(digest, entry)
+        version, user, token = entry
+        #every request gets its own copy of the cached user
+        return copy.copy(user), token
+
+
+#the API views that need a user accept a token,and a username and password like before
+API_AUTHENTICATION = [CachedTokenAuthentication, BasicAuthentication]
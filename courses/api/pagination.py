@@ -0,0 +1,21 @@
+from django.conf import settings
+from rest_framework.pagination import CursorPagination, PageNumberPagination
+
+#the list endpoints return one page at a time.clients can ask for smaller or bigger pages with
+#the page_size parameter,up to API_MAX_PAGE_SIZE
+
+MAX_PAGE_SIZE = getattr(settings, 'API_MAX_PAGE_SIZE', 100)
+
+
+class CourseCursorPagination(CursorPagination):
+    ordering = ('-created', '-id')
+    page_size_query_param = 'page_size'
+    max_page_size = MAX_PAGE_SIZE
+
+#a cursor(keyset) pagination filters on the position of the last course of the previous page
+#instead of using an OFFSET,so every page costs the same no matter how deep the client goes
+
+
+class SubjectPagination(PageNumberPagination):
+    page_size_query_param = 'page_size'
+    max_page_size = MAX_PAGE_SIZE
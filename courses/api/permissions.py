@@ -1,7 +1,15 @@
 from rest_framework.permissions import BasePermission 
 
+from ..enrollment import is_enrolled
+
 class IsEnrolled(BasePermission):
     def has_object_permission(self, request, view, obj):
-        return obj.students.filter(id=request.user.id).exists()
+        return is_enrolled(request.user, obj.id)
         #we check tht the userperforming the request is present in the students rxnship of the
-        #Course object
\ No newline at end of file
+        #Course object,using the cached course ids of the user
+
+
+class IsCourseOwner(BasePermission):
+    def has_object_permission(self, request, view, obj):
+        return obj.owner_id == request.user.id
+        #only the instructor who created the course can enroll other users in it
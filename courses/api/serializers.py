@@ -1,6 +1,7 @@
 #from attr import fields
+from django.conf import settings
 from rest_framework import serializers
-from ..models import Subject,Course,Module,Content
+from ..models import Subject,Course,Module,Content,SearchEntry
 
 
 class SubjectSerializer(serializers.ModelSerializer):
@@ -63,3 +64,28 @@ class CourseWithContentsSerializer(serializers.ModelSerializer):
         model = Course 
         fields = ['id','subject','title','slug','overview','created','owner','modules']
 
+
+class SearchEntrySerializer(serializers.ModelSerializer):
+    course_slug = serializers.SlugRelatedField(source='course', slug_field='slug', read_only=True)
+    rank = serializers.FloatField(read_only=True)
+
+    class Meta:
+        model = SearchEntry
+        fields = ['kind', 'object_id', 'title', 'course', 'course_slug', 'rank']
+
+
+class BulkEnrollSerializer(serializers.Serializer):
+    user_ids = serializers.ListField(child=serializers.IntegerField(min_value=1), default=list)
+    usernames = serializers.ListField(child=serializers.CharField(max_length=150), default=list)
+
+    def validate(self, data):
+        count = len(data['user_ids']) + len(data['usernames'])
+        if not count:
+            raise serializers.ValidationError('Give the user_ids or the usernames to enroll.')
+        limit = getattr(settings, 'API_MAX_BULK_ENROLL', 5000)
+        if count > limit:
+            raise serializers.ValidationError(
+                'At most {} users can be enrolled in one request.'.format(limit))
+        return data
+
+#the users of a cohort to enroll in a course,by id,by username or both
@@ -0,0 +1,65 @@
+import json
+from itertools import islice
+
+from django.db.models import prefetch_related_objects
+from rest_framework.utils.encoders import JSONEncoder
+
+from ..models import Content
+from .serializers import CourseWithContentsSerializer, ModuleSerializer, ContentSerializer
+
+#streaming version of CourseWithContentsSerializer.instead of building the whole course as
+#python dicts before sending anything,we send the course fields first and then walk its modules
+#and contents with iterator(),encoding a chunk of contents at a time.the memory used depends on
+#the chunk size and not on the size of the course
+
+CHUNK_SIZE = 500
+
+
+class CourseHeaderSerializer(CourseWithContentsSerializer):
+    modules = None
+
+    class Meta(CourseWithContentsSerializer.Meta):
+        fields = [field for field in CourseWithContentsSerializer.Meta.fields
+                  if field != 'modules']
+
+
+def chunks(iterable, size):
+    iterator = iter(iterable)
+    chunk = list(islice(iterator, size))
+    while chunk:
+        yield chunk
+        chunk = list(islice(iterator, size))
+
+
+def encode(data):
+    return json.dumps(data, cls=JSONEncoder)
+
+
+def with_items(contents, chunk_size):
+    #iterator() doesnt run prefetch_related(),so we prefetch the items of every chunk ourselves
+    for chunk in chunks(contents, chunk_size):
+        prefetch_related_objects(chunk, 'item')
+        yield from chunk
+
+
+def stream_course_contents(course, chunk_size=CHUNK_SIZE):
+    yield encode(CourseHeaderSerializer(course).data)[:-1] + ', "modules": ['
+
+    modules = course.modules.order_by('order', 'id').iterator(chunk_size=chunk_size)
+    contents = (Content.objects.filter(module__course=course)
+                .order_by('module__order', 'module_id', 'order', 'id')
+                .iterator(chunk_size=chunk_size))
+    contents = with_items(contents, chunk_size)
+
+    #both iterators follow the same module order,so the contents of each module come next
+    content = next(contents, None)
+    for index, module in enumerate(modules):
+        data = ModuleSerializer(module).data
+        yield (', ' if index else '') + encode(data)[:-1] + ', "contents": ['
+        first = True
+        while content is not None and content.module_id == module.id:
+            yield ('' if first else ', ') + encode(ContentSerializer(content).data)
+            first = False
+            content = next(contents, None)
+        yield ']}'
+    yield ']}'
@@ -8,8 +8,12 @@ router = routers.DefaultRouter()
 router.register('courses', views.CourseViewSet)
 
 urlpatterns = [
-    path('subjects/',views.SubjectListView.as_view(),name='subject_list'),
-    path('subjects/<pk>/',views.SubjectDetailView.as_view(),name='subject_detail'),
+    path('subjects/',views.AsyncSubjectListView.as_view(),name='subject_list'),
+    path('subjects/<int:pk>/',views.AsyncSubjectDetailView.as_view(),name='subject_detail'),
+    path('courses/',views.AsyncCourseListView.as_view(),name='course-list'),
+    path('courses/<int:pk>/',views.AsyncCourseDetailView.as_view(),name='course-detail'),
+    path('search/',views.SearchView.as_view(),name='search'),
+    path('token/',views.TokenView.as_view(),name='token'),
     path('courses/<pk>/enroll/',views.CourseEnrollView.as_view(),name='course_enroll'),
     path('', include(router.urls)),
 ]
\ No newline at end of file
@@ -1,37 +1,91 @@
+import asyncio
+
+from asgiref.sync import sync_to_async
 from urllib import request
+from django.db.models import Prefetch
+from django.http import Http404, JsonResponse, StreamingHttpResponse
 from django.shortcuts import get_object_or_404
 from rest_framework.views import APIView
 from rest_framework.response import Response 
 from rest_framework import generics, viewsets
-from rest_framework.authentication import BasicAuthentication
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.exceptions import APIException, NotAcceptable
+from rest_framework.negotiation import DefaultContentNegotiation
+from rest_framework.renderers import JSONRenderer
+from rest_framework.settings import api_settings
+from rest_framework.authtoken.models import Token
+from rest_framework.authtoken.views import ObtainAuthToken
+from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.decorators import action
-from ..models import Subject,Course
-from .serializers import SubjectSerializer,CourseSerializer
+from rest_framework.exceptions import NotFound
+from rest_framework.request import Request
+from rest_framework.utils.encoders import JSONEncoder
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+from django.views.generic.base import View
+from .. import search
+from ..asynchronous import AsyncViewMixin, query
+from ..conditional import (VALIDATOR_FIELDS, course_etag, last_modified, not_modified,
+                           set_validators)
+from ..enrollment import enroll, enroll_many, find_users, is_enrolled
+from ..models import Subject,Course,Module,Content
+from .serializers import SubjectSerializer,CourseSerializer,ModuleSerializer,SearchEntrySerializer
+from .serializers import BulkEnrollSerializer
 from courses.api import serializers 
 
 
-from .permissions import IsEnrolled 
+from .authentication import API_AUTHENTICATION
+from .pagination import CourseCursorPagination, SubjectPagination
+from .permissions import IsCourseOwner, IsEnrolled
 from .serializers import CourseWithContentsSerializer
+from .streaming import CourseHeaderSerializer, stream_course_contents
 
 
 class SubjectListView(generics.ListAPIView):
-    queryset = Subject.objects.all() 
-    serializer_class = SubjectSerializer 
+    read_from_replica = True
+    queryset = Subject.objects.all()
+    serializer_class = SubjectSerializer
+    pagination_class = SubjectPagination
 
 class SubjectDetailView(generics.RetrieveAPIView):
+    read_from_replica = True
     queryset = Subject.objects.all()
     serializer_class = SubjectSerializer
 
+
+class SearchView(APIView):
+    read_from_replica = True
+    permission_classes = (AllowAny,)
+
+    def get(self, request, format=None):
+        results = search.search(request.query_params.get('q', ''))
+        return Response(SearchEntrySerializer(results, many=True).data)
+#ranked full text search over courses,modules and text contents
+
+class TokenView(ObtainAuthToken):
+    authentication_classes = API_AUTHENTICATION
+
+    def get_permissions(self):
+        if self.request.method == 'DELETE':
+            return [IsAuthenticated()]
+        return super(TokenView, self).get_permissions()
+
+    def delete(self, request, format=None):
+        Token.objects.filter(user=request.user).delete()
+        return Response(status=204)
+#POST with the username and password returns the token of the user,creating it the first time.
+#DELETE revokes it,the next POST creates a new one.the handler in signals.py drops a deleted
+#token from the cache of this process
+
 #aview for users to enroll inc ourses
 #   
 class CourseEnrollView(APIView):
-    authentication_classes = (BasicAuthentication,)
+    authentication_classes = API_AUTHENTICATION
     permission_classes = (IsAuthenticated, )
     def post(self, request, pk, format=None):
-        course=get_object_or_404(Course, pk=pk)
-        course.students.add(request.user)
+        if not is_enrolled(request.user, pk):
+            course=get_object_or_404(Course, pk=pk)
+            enroll(request.user, course)
         return Response({'enrolled':True})
+    #enrolling twice is a no-op,an enrolled user is answered from the cache without any query
 
 
 # class CourseViewSet(viewsets.ReadOnlyModelViewSet):
@@ -42,30 +96,78 @@ class CourseEnrollView(APIView):
 
 
 class CourseViewSet(viewsets.ReadOnlyModelViewSet):
+    read_from_replica = True
     queryset = Course.objects.all()
     serializer_class = CourseSerializer
+    pagination_class = CourseCursorPagination
 
-    @action(detail=False,methods=['post'], 
-                authentication_classes=[BasicAuthentication],
+    def get_queryset(self):
+        qs = super(CourseViewSet, self).get_queryset()
+        if self.action != 'contents':
+            qs = qs.prefetch_related('modules')
+        elif 'stream' not in self.request.query_params:
+            qs = qs.prefetch_related(
+                Prefetch('modules__contents', queryset=Content.objects.with_items()))
+        return qs
+    #for the contents action we prefetch the modules,their contents and the content items,
+    #so serializing a course costs a fixed number of queries instead of one per item.the
+    #other actions only nest the modules,which we load for the whole page with one query.
+    #the JSON list and detail are answered by the async views above
+
+    @action(detail=True,methods=['post'], 
+                authentication_classes=API_AUTHENTICATION,
                 permission_classes=[IsAuthenticated]
             )
     def enroll(self, request, *args, **kwargs):
         course = self.get_object()
-        course.students.add(request.user)
+        enroll(request.user, course)
         return Response({'enrolled':True})
 
-    @action(detail=False,methods=['get'],serializer_class=CourseWithContentsSerializer,
-                authentication_classes=[BasicAuthentication],
+    @action(detail=True,methods=['post'],url_path='bulk-enroll',
+                serializer_class=BulkEnrollSerializer,
+                authentication_classes=API_AUTHENTICATION,
+                permission_classes=[IsAuthenticated,IsCourseOwner])
+    def bulk_enroll(self, request, *args, **kwargs):
+        course = self.get_object()
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        user_ids, missing_ids, missing_usernames = find_users(**serializer.validated_data)
+        added, enrolled = enroll_many(course, user_ids)
+        return Response({'added':added, 'already_enrolled':enrolled,
+                         'not_found':{'user_ids':missing_ids, 'usernames':missing_usernames}})
+    #enrolls a whole cohort with one request,so the password is hashed once instead of once
+    #per student,and the rows are inserted in batches,see enroll_many()
+
+    @action(detail=True,methods=['get'],serializer_class=CourseWithContentsSerializer,
+                authentication_classes=API_AUTHENTICATION,
                 permission_classes=[IsAuthenticated,IsEnrolled])
-    def contents(self, *args, **kwargs):
-        return self.retrieve(request, *args, **kwargs)
+    def contents(self, request, *args, **kwargs):
+        #the validators first,with the permission check on them,before the contents are read
+        course = get_object_or_404(Course.objects.only(*VALIDATOR_FIELDS), pk=kwargs['pk'])
+        self.check_object_permissions(request, course)
+        stream = 'stream' in request.query_params
+        etag = course_etag(course, variant='{}:{}'.format(request.accepted_renderer.format, stream))
+        modified = last_modified(course)
+        response = not_modified(request, etag, modified)
+        if response is not None:
+            return set_validators(response, etag, modified)
+        if stream:
+            course = self.get_object()
+            response = StreamingHttpResponse(stream_course_contents(course),
+                                             content_type='application/json')
+        else:
+            response = Response(self.get_serializer(self.get_object()).data)
+        return set_validators(response, etag, modified)
+    #with ?stream the contents are encoded and sent module by module while they are read from
+    #the database,see streaming.py.the response has the same shape as the normal one.a client
+    #that sends the ETag it got gets a 304 until the course changes,see conditional.py
     
 #we use the detail_route decorator to specify that this action is performed on asingle object
 #we specify that only the GET mthd is allowed for this action
 #We use both the IsAuthenticated and our custom IsEnrolled
 #permissions. By doing so, we make sure that only users
 #enrolled in the course are able to access its contents.
-#We use the existing retrieve() action to return the Course object.
+#We serialize the Course object with its contents.
 
 
 
@@ -76,4 +178,115 @@ class CourseViewSet(viewsets.ReadOnlyModelViewSet):
 #we use the detail_route decorator decorator of the framework to specify that this is an action
 #to be performed on asingle object.
 #the decorator allows us to add custom attributes for the action.we specify that only
-#the post mthd is allowed for the view and set the authentication and 
\ No newline at end of file
+#the post mthd is allowed for the view and set the authentication and 
+
+
+#==async read only endpoints for subjects and courses.the framework views are sync,under ASGI
+#each of them holds a thread for the whole request.the async views answer the GET requests for
+#JSON,the format of nearly every client,with the same data,using the serializers and paginators
+#of the framework.independent queries run at the same time,see courses/asynchronous.py.
+#everything else,the browsable API,other formats and methods,goes to the framework view of the
+#same URL
+
+def json_response(data, status=200):
+    return JsonResponse(data, encoder=JSONEncoder, safe=False, status=status)
+
+
+def renders_json(request):
+    renderers = [renderer() for renderer in api_settings.DEFAULT_RENDERER_CLASSES]
+    try:
+        renderer, media_type = DefaultContentNegotiation().select_renderer(Request(request),
+                                                                           renderers)
+    except NotAcceptable:
+        return False
+    return isinstance(renderer, JSONRenderer)
+
+
+class AsyncAPIView(AsyncViewMixin, View):
+    read_from_replica = True
+    #the framework view of the same URL
+    api_view = None
+
+    def dispatch(self, request, *args, **kwargs):
+        if request.method in ('GET', 'HEAD') and renders_json(request):
+            return self.json_dispatch(request, *args, **kwargs)
+        return sync_to_async(self.api_view)(request, *args, **kwargs)
+
+    async def json_dispatch(self, request, *args, **kwargs):
+        try:
+            return await self.get(request, *args, **kwargs)
+        except Http404:
+            exc = NotFound()
+        except APIException as e:
+            exc = e
+        #the body and status the framework answers an error with
+        return json_response({'detail': exc.detail}, status=exc.status_code)
+
+
+class AsyncSubjectListView(AsyncAPIView):
+    api_view = staticmethod(SubjectListView.as_view())
+
+    async def get(self, request):
+        paginator = SubjectPagination()
+        size = paginator.get_page_size(Request(request))
+        try:
+            number = int(request.GET.get(paginator.page_query_param, 1))
+        except ValueError:
+            raise NotFound('Invalid page.')
+        if number < 1:
+            raise NotFound('Invalid page.')
+        subjects = Subject.objects.all()
+        offset = (number - 1) * size
+        #the count and the page dont depend on each other
+        count, page = await asyncio.gather(query(subjects.count),
+                                           query(list, subjects[offset:offset + size]))
+        if not page and number > 1:
+            raise NotFound('Invalid page.')
+        url = request.build_absolute_uri()
+        previous = None
+        if number == 2:
+            previous = remove_query_param(url, paginator.page_query_param)
+        elif number > 2:
+            previous = replace_query_param(url, paginator.page_query_param, number - 1)
+        return json_response({
+            'count': count,
+            'next': (replace_query_param(url, paginator.page_query_param, number + 1)
+                     if offset + size < count else None),
+            'previous': previous,
+            'results': SubjectSerializer(page, many=True).data,
+        })
+
+class AsyncSubjectDetailView(AsyncAPIView):
+    api_view = staticmethod(SubjectDetailView.as_view())
+
+    async def get(self, request, pk):
+        subject = await query(get_object_or_404, Subject, pk=pk)
+        return json_response(SubjectSerializer(subject).data)
+
+
+def course_page(request):
+    paginator = CourseCursorPagination()
+    courses = paginator.paginate_queryset(Course.objects.prefetch_related('modules'),
+                                          Request(request))
+    return paginator.get_paginated_response(CourseSerializer(courses, many=True).data).data
+
+
+class AsyncCourseListView(AsyncAPIView):
+    api_view = staticmethod(CourseViewSet.as_view({'get': 'list'}))
+
+    async def get(self, request):
+        #the modules of the page are prefetched for the courses of the page,one after the other
+        return json_response(await query(course_page, request))
+
+
+class AsyncCourseDetailView(AsyncAPIView):
+    api_view = staticmethod(CourseViewSet.as_view({'get': 'retrieve'}))
+
+    async def get(self, request, pk):
+        #the course and its modules are read at the same time
+        course, modules = await asyncio.gather(
+            query(get_object_or_404, Course, pk=pk),
+            query(list, Module.objects.filter(course_id=pk)))
+        data = CourseHeaderSerializer(course).data
+        data['modules'] = ModuleSerializer(modules, many=True).data
+        return json_response(data)
@@ -3,3 +3,7 @@ from django.apps import AppConfig
 
 class CoursesConfig(AppConfig):
     name = 'courses'
+
+    def ready(self):
+        #import the signal handlers that keep the catalog cache up to date
+        from . import signals
@@ -0,0 +1,57 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from functools import update_wrapper
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections
+
+#helpers for the async views.under an ASGI server(educa/asgi.py) an async view doesnt hold a
+#thread while it waits.the ORM of this django version is sync only,so the queries still run in
+#threads:query() runs one in a thread of its own executor and gives the event loop back
+#until it is done.queries that dont depend on each other are started together with
+#asyncio.gather() and run at the same time,each in its own thread with its own connection
+
+#the default executor of asyncio has only a few threads on a small machine,every query of the
+#worker would wait for one of them
+_executor = None
+
+
+def get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=getattr(settings, 'ASYNC_QUERY_THREADS', 32),
+                                       thread_name_prefix='query')
+    return _executor
+
+
+def run(func, args, kwargs):
+    try:
+        return func(*args, **kwargs)
+    finally:
+        #the request signals only close the connection of the request thread,the executor
+        #threads close theirs here once they are too old for CONN_MAX_AGE or after an error
+        close_old_connections()
+
+
+async def query(func, *args, **kwargs):
+    return await sync_to_async(run, thread_sensitive=False,
+                               executor=get_executor())(func, args, kwargs)
+
+
+class AsyncViewMixin(object):
+    #class based views with async handlers,get() can be an async def.django only awaits views
+    #that are coroutine functions,so as_view() returns one
+    @classmethod
+    def as_view(cls, **initkwargs):
+        view = super(AsyncViewMixin, cls).as_view(**initkwargs)
+
+        async def async_view(request, *args, **kwargs):
+            response = view(request, *args, **kwargs)
+            if asyncio.iscoroutine(response):
+                #http_method_not_allowed() and options() answer without awaiting
+                response = await response
+            return response
+
+        update_wrapper(async_view, view)
+        return async_view
@@ -0,0 +1,52 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, transaction
+from django.db.models import Count
+
+from .models import Subject, Course
+
+#the course catalog is the most visited page,so we keep the subjects with their number of
+#courses and the courses of each subject with their number of modules in the cache framework.
+#the keys are deleted by the signal handlers in signals.py whenever a Subject,Course or Module
+#changes,so the timeout only bounds how long a change made with queryset.update() can be missed.
+#the cache is filled from the primary database,a replica that lags behind would keep the old
+#rows in the cache after the keys were deleted
+
+CATALOG_TIMEOUT = getattr(settings, 'CATALOG_CACHE_TIMEOUT', 60 * 60)
+
+SUBJECTS_KEY = 'catalog:subjects'
+
+
+def courses_key(subject_id=None):
+    return 'catalog:courses:{}'.format(subject_id or 'all')
+
+
+def get_subjects():
+    subjects = cache.get(SUBJECTS_KEY)
+    if subjects is None:
+        subjects = list(Subject.objects.using(DEFAULT_DB_ALIAS).annotate(total_courses=Count('courses')))
+        cache.set(SUBJECTS_KEY, subjects, CATALOG_TIMEOUT)
+    return subjects
+
+
+def get_courses(subject_id=None):
+    key = courses_key(subject_id)
+    courses = cache.get(key)
+    if courses is None:
+        courses = Course.objects.using(DEFAULT_DB_ALIAS).annotate(total_modules=Count('modules'))
+        courses = courses.select_related('subject', 'owner')
+        if subject_id:
+            courses = courses.filter(subject_id=subject_id)
+        courses = list(courses)
+        cache.set(key, courses, CATALOG_TIMEOUT)
+    return courses
+#we select the subject and owner with the courses because the catalog template shows them,
+#so a cached list renders without any query
+
+
+def invalidate_catalog(*subject_ids):
+    keys = [SUBJECTS_KEY, courses_key()]
+    keys += [courses_key(subject_id) for subject_id in subject_ids if subject_id]
+    transaction.on_commit(lambda: cache.delete_many(keys))
+#we delete the keys once the transaction commits,otherwise a request could cache the old rows
+#again before the change is visible
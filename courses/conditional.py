@@ -0,0 +1,42 @@
+from calendar import timegm
+from hashlib import md5
+
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, quote_etag
+
+#conditional GET for the course pages and the course contents API.the validators come from the
+#version and updated columns of the course,which change with every change to the course,its
+#modules,their contents or the content items(see versions.py).so the view loads only those
+#columns,and when the client already has the current response it answers 304 Not Modified
+#before reading the modules,serializing or rendering anything.
+#the API sends a strong ETag,the JSON is the same byte for byte until the course changes.the
+#pages send Last-Modified and a weak ETag:they contain a CSRF token that differs on every render
+#and Last-Modified only has a precision of one second,the ETag catches two changes in a second
+
+VALIDATOR_FIELDS = ('id', 'version', 'updated')
+
+
+def course_etag(course, variant='', weak=False):
+    #variant tells apart the representations of one URL,like the renderer formats of the API
+    value = '{}:{}:{}:{}'.format(course.id, course.version, course.updated.isoformat(), variant)
+    etag = quote_etag(md5(value.encode()).hexdigest())
+    return 'W/' + etag if weak else etag
+
+
+def last_modified(course):
+    return timegm(course.updated.utctimetuple())
+
+
+def not_modified(request, etag=None, modified=None):
+    #the 304 response,or None when the view has to build the response
+    return get_conditional_response(request, etag=etag, last_modified=modified)
+
+
+def set_validators(response, etag=None, modified=None):
+    if etag:
+        response.setdefault('ETag', etag)
+    if modified:
+        response.setdefault('Last-Modified', http_date(modified))
+    #the responses depend on the user,browsers keep them but ask again every time
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
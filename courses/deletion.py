@@ -0,0 +1,128 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.contrib.contenttypes.models import ContentType
+from django.db import transaction
+
+from .catalog import invalidate_catalog
+from .enrollment import invalidate_enrollments
+from .media import remove_files
+from .models import (Course, Module, Content, Text, File, Image, ImageVariant, ChunkedUpload,
+                     SearchEntry)
+from .versions import bump_courses, bump_modules
+
+#==bulk deletion of contents,modules and courses.the items of the contents are only reachable
+#through the GenericForeignKey,so deleting a module or course with delete() cascades its
+#Content rows and leaves the Text,Video,Image and File rows and their files behind.the
+#functions below collect the items with one query and delete every model with delete() per
+#batch of ids,which follows the foreign keys of the model and deletes the rows without signals
+#with one statement.the post_delete handlers in signals.py skip the rows deleted here and the
+#functions do their work once for all rows:versions,search entries and the catalog.the files
+#are removed in the background after the commit.the cached HTML of the items is left to
+#expire,its keys cant be asked for again
+
+BATCH_SIZE = 500
+
+_bulk_deletion = ContextVar('courses_bulk_deletion', default=False)
+
+
+def in_bulk_deletion():
+    return _bulk_deletion.get()
+
+
+@contextmanager
+def bulk_deletion():
+    token = _bulk_deletion.set(True)
+    try:
+        yield
+    finally:
+        _bulk_deletion.reset(token)
+
+
+def batches(ids):
+    ids = list(ids)
+    for start in range(0, len(ids), BATCH_SIZE):
+        yield ids[start:start + BATCH_SIZE]
+
+
+def storage_files(qs):
+    storage = qs.model._meta.get_field('file').storage
+    return [(storage, name) for name in qs.values_list('file', flat=True).distinct() if name]
+
+
+def delete_items(items):
+    #items maps content type ids to object ids.returns the (storage,name) pairs of their files,
+    #a file shared with items that are kept is left by the storage,see storage.py
+    files = []
+    for content_type_id, object_ids in items.items():
+        model = ContentType.objects.get_for_id(content_type_id).model_class()
+        for ids in batches(object_ids):
+            if model in (File, Image):
+                files += storage_files(model.objects.filter(pk__in=ids))
+            if model is Image:
+                #the variants go with their image
+                files += storage_files(ImageVariant.objects.filter(image_id__in=ids))
+            with bulk_deletion():
+                model.objects.filter(pk__in=ids).delete()
+            if model is Text:
+                SearchEntry.objects.filter(kind='text', object_id__in=ids).delete()
+    return files
+
+
+def collect_items(contents):
+    items = {}
+    content_ids, module_ids = [], set()
+    for pk, module_id, content_type_id, object_id in contents.values_list(
+            'pk', 'module_id', 'content_type_id', 'object_id'):
+        items.setdefault(content_type_id, []).append(object_id)
+        content_ids.append(pk)
+        module_ids.add(module_id)
+    return items, content_ids, module_ids
+
+
+def delete_contents(contents):
+    #deletes the contents of the queryset and their items
+    with transaction.atomic(using=contents.db):
+        items, content_ids, module_ids = collect_items(contents)
+        files = delete_items(items)
+        for ids in batches(content_ids):
+            with bulk_deletion():
+                Content.objects.filter(pk__in=ids).delete()
+        bump_modules(*module_ids)
+    transaction.on_commit(lambda: remove_files(files), using=contents.db)
+
+
+def delete_modules(modules):
+    #deletes the modules of the queryset with their contents,items and unfinished uploads.the
+    #contents and uploads go with their module
+    with transaction.atomic(using=modules.db):
+        rows = list(modules.values_list('id', 'course_id'))
+        module_ids = [module_id for module_id, course_id in rows]
+        course_ids = {course_id for module_id, course_id in rows}
+        files, paths = [], []
+        for ids in batches(module_ids):
+            items = collect_items(Content.objects.filter(module_id__in=ids))[0]
+            files += delete_items(items)
+            uploads = ChunkedUpload.objects.filter(module_id__in=ids)
+            paths += [ChunkedUpload(id=pk).path for pk in uploads.values_list('id', flat=True)]
+            SearchEntry.objects.filter(kind='module', object_id__in=ids).delete()
+            with bulk_deletion():
+                Module.objects.filter(pk__in=ids).delete()
+        bump_courses(*course_ids)
+        #the catalog shows the number of modules of every course
+        invalidate_catalog(*Course.objects.filter(pk__in=course_ids)
+                           .values_list('subject_id', flat=True))
+    transaction.on_commit(lambda: remove_files(files, paths), using=modules.db)
+
+
+def delete_courses(courses):
+    #deletes the courses of the queryset with everything in them.the course rows are few,
+    #they go through delete() so their signal handlers run
+    with transaction.atomic(using=courses.db):
+        course_ids = list(courses.values_list('id', flat=True))
+        student_ids = set(Course.students.through.objects.filter(course_id__in=course_ids)
+                          .values_list('user_id', flat=True))
+        delete_modules(Module.objects.filter(course_id__in=course_ids))
+        Course.objects.filter(pk__in=course_ids).delete()
+        #deleting the course removes its students without m2m_changed
+        invalidate_enrollments(*student_ids)
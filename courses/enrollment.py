@@ -0,0 +1,84 @@
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, transaction
+
+#the courses a student is enrolled in are checked on every course page and contents request,
+#so we keep the set of course ids of each user in the cache.the m2m_changed handler in
+#signals.py deletes the set whenever the enrollments of a user change.it is read from the
+#primary database,like the catalog
+
+ENROLLMENT_TIMEOUT = 60 * 60
+ENROLL_BATCH_SIZE = 1000
+
+
+def enrollment_key(user_id):
+    return 'enrollment:{}'.format(user_id)
+
+
+def enrolled_course_ids(user):
+    if not user.is_authenticated:
+        return frozenset()
+    key = enrollment_key(user.id)
+    course_ids = cache.get(key)
+    if course_ids is None:
+        course_ids = frozenset(user.courses_joined.using(DEFAULT_DB_ALIAS)
+                               .values_list('id', flat=True))
+        cache.set(key, course_ids, ENROLLMENT_TIMEOUT)
+    return course_ids
+
+
+def is_enrolled(user, course_id):
+    return int(course_id) in enrolled_course_ids(user)
+
+
+def enroll(user, course):
+    #returns False when the user was already enrolled,in that case nothing is written
+    if is_enrolled(user, course.id):
+        return False
+    course.students.add(user)
+    return True
+
+
+def invalidate_enrollments(*user_ids):
+    keys = [enrollment_key(user_id) for user_id in user_ids]
+    transaction.on_commit(lambda: cache.delete_many(keys))
+
+
+def batches(values, size):
+    for start in range(0, len(values), size):
+        yield values[start:start + size]
+
+
+def find_users(user_ids=(), usernames=()):
+    #the ids of the users given by id or by username,and the ids and usernames that dont exist
+    user_ids, usernames = list(dict.fromkeys(user_ids)), list(dict.fromkeys(usernames))
+    found, missing_ids, missing_usernames = [], [], []
+    for batch in batches(user_ids, ENROLL_BATCH_SIZE):
+        existing = set(User.objects.filter(id__in=batch).values_list('id', flat=True))
+        found.extend(user_id for user_id in batch if user_id in existing)
+        missing_ids.extend(user_id for user_id in batch if user_id not in existing)
+    for batch in batches(usernames, ENROLL_BATCH_SIZE):
+        existing = dict(User.objects.filter(username__in=batch).values_list('username', 'id'))
+        found.extend(existing[username] for username in batch if username in existing)
+        missing_usernames.extend(username for username in batch if username not in existing)
+    return found, missing_ids, missing_usernames
+
+
+def enroll_many(course, user_ids, batch_size=ENROLL_BATCH_SIZE):
+    #enrolls a whole cohort:per batch one query for the users already enrolled and one INSERT
+    #for the others.returns the number of users added and the number already enrolled
+    through = course.students.through
+    user_ids = list(dict.fromkeys(user_ids))
+    added = 0
+    with transaction.atomic():
+        for batch in batches(user_ids, batch_size):
+            enrolled = set(through.objects.filter(course_id=course.id, user_id__in=batch)
+                           .values_list('user_id', flat=True))
+            new = [user_id for user_id in batch if user_id not in enrolled]
+            #ignore_conflicts skips the rows enrolled by another request in the meantime
+            through.objects.bulk_create([through(course_id=course.id, user_id=user_id)
+                                         for user_id in new], ignore_conflicts=True)
+            #bulk_create() doesnt send m2m_changed,the cached enrollments are deleted here
+            invalidate_enrollments(*new)
+            added += len(new)
+    return added, len(user_ids) - added
@@ -25,9 +25,9 @@
 
 
 
-from django.db import models
-from django.core.exceptions import ObjectDoesNotExist
-from django.db.models import fields, query
+from django.db import models, router, connections, transaction
+from django.db.models import F, Max, Q
+from django.dispatch import Signal
 
 
 
@@ -39,43 +39,141 @@ from django.db.models import fields, query
 #before saving the field into the database.in this mthd we perform the follwoing actions
 
 #1-we check if a value alerady exists for this field in the model instance,we use self.attname,which
-# is the attribute name given to the field in the model.if the attribute's value is different than
-# None,we calculate the order we should give it as follows
-# 1==.  we build a queryset to retiriev all objects for the field's model.we retrieve the model 
-# class the field belongs to by accessing self.model 
-#we filter the queryset by the fields' current value for the model fields 
+# is the attribute name given to the field in the model.if the attribute's value is None,
+# we calculate the order we should give it as follows
+# 1==.  we lock the rows the order is calculated with respect to(the course of a module,the
+# module of a content),so two inserts into the same course or module cant read the same order
+# 2==.  we get the highest order of the objects with the same for_fields values with a single
+# MAX() aggregate and add 1 to it
 class OrderField(models.PositiveIntegerField):
     def __init__(self, for_fields=None, *args, **kwargs):
         self.for_fields=for_fields
         super(OrderField, self).__init__(*args, **kwargs)
 
+    def get_scope(self, model_instance):
+        #the values of the for_fields for this instance.we use the attname(course_id,module_id)
+        #so we dont fetch the related objects
+        fields = [self.model._meta.get_field(name) for name in self.for_fields or []]
+        return tuple((field.attname, getattr(model_instance, field.attname)) for field in fields)
+
+    def lock_scopes(self, using, scopes):
+        #select_for_update() needs a transaction that holds the lock until the insert,
+        #OrderedModel.save() and OrderedQuerySet.bulk_create() open one.backends without
+        #SELECT ... FOR UPDATE(SQLite) ignore it and serialize writers on the whole database
+        #instead
+        if connections[using].get_autocommit():
+            return
+        for name in self.for_fields or []:
+            field = self.model._meta.get_field(name)
+            if not field.is_relation:
+                continue
+            values = {dict(scope)[field.attname] for scope in scopes}
+            lookup = {'{}__in'.format(field.target_field.attname): values}
+            list(field.related_model._default_manager.using(using)
+                    .select_for_update().filter(**lookup).values_list('pk'))
+
+    def next_values(self, using, scopes):
+        #returns the next free order for every scope with one query
+        qs = self.model._default_manager.using(using).order_by()
+        if not self.for_fields:
+            last = qs.aggregate(last=Max(self.attname))['last']
+            return {(): 0 if last is None else last + 1}
+        names = [attname for attname, value in next(iter(scopes))]
+        condition = Q()
+        for scope in scopes:
+            condition |= Q(**dict(scope))
+        rows = qs.filter(condition).values(*names).annotate(last=Max(self.attname))
+        found = {tuple((name, row[name]) for name in names): row['last'] + 1 for row in rows}
+        return {scope: found.get(scope, 0) for scope in scopes}
+
+    def assign(self, objs, using):
+        #bulk path: gives every object without an order the next consecutive orders of its scope
+        pending = [obj for obj in objs if getattr(obj, self.attname) is None]
+        if not pending:
+            return
+        scopes = {self.get_scope(obj) for obj in pending}
+        self.lock_scopes(using, scopes)
+        values = self.next_values(using, scopes)
+        for obj in pending:
+            scope = self.get_scope(obj)
+            setattr(obj, self.attname, values[scope])
+            values[scope] += 1
 
     def pre_save(self, model_instance, add: bool):
         if getattr(model_instance, self.attname) is None:
             #no current value
-            try:
-                qs = self.model.objects.all()#retrieve all objects for the field's model
-                #retrieve the model class the field belongs to by accessing self.model
-                if self.for_fields:
-                    #filter by objects with the same field values
-                    #for the fields in for_fields
-                    query={field: getattr(model_instance, field) for field in self.for_fields}
-                    qs=qs.filter(**query)
-                    #filter the queryset by the fields' current value for the model fields that 
-                    #are defined in the for_fields parameter of the field,if anyby doing so we 
-                    #calculate the order with respect to the given fields
-                #get the order of the last item
-                last_item = qs.latest(self.attname)#retrieve the object with the highest order with
-                #from the database.
-                value = last_item.order+1#if an object is found, we add 1 to the highest order found
-            except ObjectDoesNotExist:
-                value = 0
-            #if no object is found,we assume this object is the fiest one and assign the order 0 to it
-            setattr(model_instance, self.attname, value)#we asign the calculated order to the field's
-            #value in the model instance using setattr() AND RETURN IT
-            return value
+            using = router.db_for_write(self.model, instance=model_instance)
+            self.assign([model_instance], using)
+            #we asign the calculated order to the field's value in the model instance and return it
+            return getattr(model_instance, self.attname)
         else:
             return super(OrderField,self).pre_save(model_instance, add)
 #if the model instance has avalue for the current field,we dont do anything
 #wen you create custom model fields, make them generic.avoid hardcoding data that depends
-#on aspecific model or field.your field should work in any model
\ No newline at end of file
+#on aspecific model or field.your field should work in any model
+
+
+class OrderedModel(models.Model):
+    class Meta:
+        abstract = True
+
+    def save(self, *args, **kwargs):
+        using = kwargs.get('using') or router.db_for_write(type(self), instance=self)
+        with transaction.atomic(using=using, savepoint=False):
+            super(OrderedModel, self).save(*args, **kwargs)
+
+#the models with an OrderField inherit from OrderedModel.save() in autocommit mode(create(),the
+#admin,scripts) would read the MAX() and insert in two transactions,with no lock between them,
+#and two inserts into the same course or module would get the same order.save() runs in one
+#transaction,so the lock taken in pre_save() is held until the row is inserted.inside a
+#transaction already it joins it without a savepoint
+
+
+#bulk_update() doesnt send post_save,post_reorder is sent instead with the objects whose order
+#changed.their for_fields values are loaded too
+post_reorder = Signal()
+
+
+class OrderedQuerySet(models.QuerySet):
+    def bulk_create(self, objs, *args, **kwargs):
+        objs = list(objs)
+        with transaction.atomic(using=self.db, savepoint=False):
+            for field in self.model._meta.concrete_fields:
+                if isinstance(field, OrderField):
+                    field.assign(objs, self.db)
+            return super(OrderedQuerySet, self).bulk_create(objs, *args, **kwargs)
+
+    def reorder(self, orders):
+        #orders maps primary keys to their new order.ids that are not in this queryset are
+        #ignored,so filtering it by owner first checks the ownership of all ids in one query
+        field = next(field for field in self.model._meta.concrete_fields
+                     if isinstance(field, OrderField))
+        orders = {int(pk): int(order) for pk, order in orders.items()}
+        with transaction.atomic(using=self.db):
+            scope = [field.model._meta.get_field(name).attname for name in field.for_fields or []]
+            objs = list(self.select_for_update(of=('self',)).filter(pk__in=orders)
+                        .only('pk', field.attname, *scope))
+            changed = []
+            for obj in objs:
+                if getattr(obj, field.attname) != orders[obj.pk]:
+                    setattr(obj, field.attname, orders[obj.pk])
+                    changed.append(obj)
+            if changed:
+                #the orders are unique per scope and checked row by row,so a swap written in
+                #one statement would collide.the changed rows are moved past the highest order
+                #of their scopes first,keeping them apart,and then given their new orders
+                shift = max(field.next_values(self.db, {field.get_scope(obj) for obj in changed})
+                            .values())
+                manager = self.model._default_manager.db_manager(self.db)
+                manager.filter(pk__in=[obj.pk for obj in changed]).update(
+                    **{field.attname: F(field.attname) + shift})
+                manager.bulk_update(changed, [field.name])
+                post_reorder.send(sender=self.model, instances=changed, using=self.db)
+        return {obj.pk: getattr(obj, field.attname) for obj in objs}
+
+#bulk_create() calls pre_save() for every object before any of them is inserted,so all of them
+#would get the same order.OrderedQuerySet assigns N consecutive orders per course or module
+#with one query first,inside the same transaction as the insert
+#reorder() writes only the rows whose order changed,with two UPDATEs inside a transaction,so
+#readers never see a half applied reorder.two objects given the same order in one scope raise
+#IntegrityError
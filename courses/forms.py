@@ -1,8 +1,10 @@
+import os
+
 from django import forms
 from django.contrib.contenttypes import fields
 from django.db import models
 from django.forms.models import inlineformset_factory
-from .models import Course, Module
+from .models import Course, Module, ChunkedUpload
 
 #since a course , is divided into avariable number of modules, it makes sense to use to use
 #formsets to manage them. 
@@ -18,3 +20,12 @@ ModuleFormSet = inlineformset_factory(Course, Module, fields=['title','descripti
 #can_delete=>if u set this to True,Django will include a boolean field for each form that will be
 #rendered as acheckbox input,it allows u to mark the objects u want to delete
 
+
+class ChunkedUploadForm(forms.ModelForm):
+    class Meta:
+        model = ChunkedUpload
+        fields = ['title', 'filename', 'size', 'sha256']
+
+    def clean_filename(self):
+        #only the base name is kept,the storage decides the directory
+        return os.path.basename(self.cleaned_data['filename'])
@@ -0,0 +1,24 @@
+import os
+
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+#the CPU work of the image pipeline.this module doesnt import django,so resize() can run in a
+#worker process of the pool without setting django up there
+
+
+def resize(source, targets):
+    #targets maps each variant name to the path to write it to and its maximum (width, height).
+    #returns the size of every variant written
+    sizes = {}
+    with Image.open(source) as original:
+        original.load()
+        for name, (path, size) in targets.items():
+            variant = original.copy()
+            variant.thumbnail(size)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            variant.save(path, format=original.format or 'PNG')
+            sizes[name] = variant.size
+    return sizes
@@ -0,0 +1,174 @@
+import asyncio
+import json
+import logging
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from wsgiref.util import setup_testing_defaults
+
+from django.core.asgi import get_asgi_application
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management.base import BaseCommand
+from django.db import connections
+from django.db.backends.signals import connection_created
+
+DEFAULT_PATHS = ['/api/subjects/', '/api/courses/']
+
+
+class Command(BaseCommand):
+    help = ('Load test of the read only views: sends the same requests through the WSGI handler '
+            'served by a fixed number of threads and through the ASGI application on one event '
+            'loop, with many clients at once, and compares throughput and latency')
+
+    def add_arguments(self, parser):
+        parser.add_argument('paths', nargs='*', default=DEFAULT_PATHS)
+        parser.add_argument('--requests', type=int, default=500, help='requests per path')
+        parser.add_argument('--concurrency', type=int, default=100,
+                            help='clients sending requests at the same time')
+        parser.add_argument('--wsgi-threads', type=int, default=8,
+                            help='threads of the WSGI server, like the threads of a worker')
+        parser.add_argument('--db-latency', type=float, default=0,
+                            help='milliseconds added to every query, the round trip to a '
+                                 'database server that a local SQLite file doesnt have')
+        parser.add_argument('--output', '-o', help='file to write the JSON results to')
+
+    def handle(self, *args, **options):
+        self.latency = options['db_latency'] / 1000
+        if self.latency:
+            connection_created.connect(self.delay_queries)
+        logging.disable(logging.CRITICAL)
+        results = {}
+        try:
+            wsgi, asgi = WSGIHandler(), get_asgi_application()
+            for path in options['paths']:
+                results[path] = {
+                    'wsgi': self.measure_wsgi(wsgi, path, options),
+                    'asgi': self.measure_asgi(asgi, path, options),
+                }
+        finally:
+            logging.disable(logging.NOTSET)
+            connection_created.disconnect(self.delay_queries)
+
+        output = json.dumps({'concurrency': options['concurrency'],
+                             'wsgi_threads': options['wsgi_threads'],
+                             'db_latency_ms': options['db_latency'], 'paths': results},
+                            indent=2, sort_keys=True)
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                f.write(output)
+        for path, modes in results.items():
+            for mode, result in modes.items():
+                self.stdout.write('{:<24} {} {:>7} {:>8.1f} req/s {:>8.1f}ms p50 {:>8.1f}ms p95'
+                                  .format(path, mode, result['status'], result['rps'],
+                                          result['p50_ms'], result['p95_ms']))
+
+    def delay_queries(self, sender, connection, **kwargs):
+        #connection_created is sent again every time the wrapper reconnects
+        if self.delay not in connection.execute_wrappers:
+            connection.execute_wrappers.append(self.delay)
+
+    def delay(self, execute, sql, params, many, context):
+        time.sleep(self.latency)
+        return execute(sql, params, many, context)
+
+    def summary(self, timings, statuses, elapsed):
+        timings.sort()
+        return {
+            'status': ','.join(sorted(statuses)),
+            'rps': round(len(timings) / elapsed, 1),
+            'p50_ms': round(statistics.median(timings), 2),
+            'p95_ms': round(timings[min(len(timings) - 1, int(len(timings) * 0.95))], 2),
+        }
+
+    def clients(self, options):
+        #the requests of every client,the clients together send --requests of them
+        concurrency = min(options['concurrency'], options['requests'])
+        return [options['requests'] // concurrency + (i < options['requests'] % concurrency)
+                for i in range(concurrency)]
+
+    def measure_wsgi(self, handler, path, options):
+        #every client waits for its response before sending the next request,at most
+        #--wsgi-threads of them are served at once and the others queue
+        timings, statuses = [], set()
+        lock = threading.Lock()
+        local = threading.local()
+
+        def serve():
+            environ = {'PATH_INFO': path, 'REQUEST_METHOD': 'GET', 'HTTP_HOST': 'localhost'}
+            setup_testing_defaults(environ)
+            response = handler(environ, lambda status, headers: statuses.add(status[:3]))
+            b''.join(response)
+            response.close()
+            local.used = True
+
+        def close():
+            #the threads of the pool close the connections they kept
+            if getattr(local, 'used', False):
+                connections.close_all()
+
+        def client(count, server):
+            for i in range(count):
+                start = time.perf_counter()
+                server.submit(serve).result()
+                with lock:
+                    timings.append((time.perf_counter() - start) * 1000)
+
+        with ThreadPoolExecutor(max_workers=options['wsgi_threads']) as server:
+            server.submit(serve).result()
+            timings.clear()
+            start = time.perf_counter()
+            threads = [threading.Thread(target=client, args=(count, server))
+                       for count in self.clients(options)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            elapsed = time.perf_counter() - start
+            for i in range(options['wsgi_threads']):
+                server.submit(close)
+        return self.summary(timings, statuses, elapsed)
+
+    def measure_asgi(self, application, path, options):
+        #every client is a coroutine on the same event loop,like the connections of one
+        #uvicorn or daphne worker
+        timings, statuses = [], set()
+
+        async def request():
+            body_sent = False
+
+            async def receive():
+                nonlocal body_sent
+                if not body_sent:
+                    body_sent = True
+                    return {'type': 'http.request', 'body': b'', 'more_body': False}
+                #the client stays connected until the response is sent
+                await asyncio.Event().wait()
+
+            async def send(message):
+                if message['type'] == 'http.response.start':
+                    statuses.add(str(message['status']))
+
+            scope = {
+                'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1',
+                'method': 'GET', 'scheme': 'http', 'path': path, 'raw_path': path.encode(),
+                'query_string': b'', 'root_path': '', 'headers': [(b'host', b'localhost')],
+                'server': ('localhost', 80), 'client': ('127.0.0.1', 50000),
+            }
+            await application(scope, receive, send)
+
+        async def client(count):
+            for i in range(count):
+                start = time.perf_counter()
+                await request()
+                timings.append((time.perf_counter() - start) * 1000)
+
+        async def run():
+            await request()
+            timings.clear()
+            start = time.perf_counter()
+            await asyncio.gather(*[client(count) for count in self.clients(options)])
+            return time.perf_counter() - start
+
+        elapsed = asyncio.run(run())
+        return self.summary(timings, statuses, elapsed)
@@ -0,0 +1,88 @@
+import base64
+import json
+import logging
+import statistics
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test import Client
+from django.test.utils import setup_test_environment, teardown_test_environment
+from rest_framework.authtoken.models import Token
+
+from courses.api.authentication import token_cache
+from courses.models import Subject, Course
+
+PASSWORD = 'bench-password'
+MODES = ('basic', 'token', 'token-uncached')
+
+
+class Command(BaseCommand):
+    help = ('Sends authenticated API requests in a test database and compares the throughput '
+            'of Basic authentication, which checks the password every time, with token '
+            'authentication with and without the cache of verified tokens')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=50, help='requests per mode')
+        parser.add_argument('--modes', nargs='+', choices=MODES, default=list(MODES))
+        parser.add_argument('--output', '-o', help='file to write the JSON results to')
+
+    def handle(self, *args, **options):
+        setup_test_environment()
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+        logging.disable(logging.CRITICAL)
+        try:
+            student = User.objects.create_user('bench-student', password=PASSWORD)
+            subject = Subject.objects.create(title='Bench', slug='bench')
+            course = Course.objects.create(owner=student, subject=subject, title='Bench',
+                                           slug='bench', overview='')
+            course.students.add(student)
+            token = Token.objects.create(user=student)
+            #enrolling an enrolled student is answered from the cached enrollments without
+            #writing,the request costs little more than its authentication
+            path = '/api/courses/{}/enroll/'.format(course.id)
+            headers = {
+                'basic': 'Basic ' + base64.b64encode(
+                    'bench-student:{}'.format(PASSWORD).encode()).decode(),
+                'token': 'Token ' + token.key,
+                'token-uncached': 'Token ' + token.key,
+            }
+            results = {mode: self.measure(path, mode, headers[mode], options['requests'])
+                       for mode in options['modes']}
+        finally:
+            token_cache.clear()
+            logging.disable(logging.NOTSET)
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+
+        output = json.dumps({'path': '/api/courses/<id>/enroll/', 'modes': results},
+                            indent=2, sort_keys=True)
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                f.write(output)
+        for mode, result in results.items():
+            self.stdout.write('{:<15} {:>4} {:>8.1f} req/s {:>8.2f}ms p50 {:>8.2f}ms p95'.format(
+                mode, result['status'], result['rps'], result['p50_ms'], result['p95_ms']))
+
+    def measure(self, path, mode, authorization, count):
+        client = Client(HTTP_AUTHORIZATION=authorization)
+        #one request first,so imports and the enrollment cache dont count
+        client.post(path)
+        timings = []
+        status = None
+        start = time.perf_counter()
+        for i in range(count):
+            if mode == 'token-uncached':
+                token_cache.clear()
+            begin = time.perf_counter()
+            status = client.post(path).status_code
+            timings.append((time.perf_counter() - begin) * 1000)
+        elapsed = time.perf_counter() - start
+        timings.sort()
+        return {
+            'status': status,
+            'rps': round(count / elapsed, 1),
+            'p50_ms': round(statistics.median(timings), 2),
+            'p95_ms': round(timings[min(len(timings) - 1, int(len(timings) * 0.95))], 2),
+        }
@@ -0,0 +1,133 @@
+import json
+import logging
+import statistics
+import threading
+import time
+from wsgiref.util import setup_testing_defaults
+
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management.base import BaseCommand
+from django.db import connections
+from django.db.backends.signals import connection_created
+
+from educa.database import POOL_ENGINE
+
+MODES = ('new', 'persistent', 'pool')
+
+
+class Command(BaseCommand):
+    help = ('Sends requests through the WSGI handler, with its request signals and middleware, '
+            'and compares their latency when every request connects to the database, when '
+            'connections persist (CONN_MAX_AGE) and when they come from the pool of '
+            'educa.postgresql_pool')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--path', default='/api/subjects/', help='read only URL to request')
+        parser.add_argument('--requests', type=int, default=200, help='requests per mode')
+        parser.add_argument('--threads', type=int, default=1,
+                            help='threads sending the requests of each mode')
+        parser.add_argument('--max-age', type=int, default=60,
+                            help='CONN_MAX_AGE of the persistent mode')
+        parser.add_argument('--modes', nargs='+', choices=MODES, default=list(MODES))
+        parser.add_argument('--database', default='default')
+        parser.add_argument('--output', '-o', help='file to write the JSON results to')
+
+    def handle(self, *args, **options):
+        self.alias = options['database']
+        settings_dict = connections[self.alias].settings_dict
+        original = {key: settings_dict.get(key) for key in ('CONN_MAX_AGE', 'POOL')}
+        connection_created.connect(self.connected)
+        logging.disable(logging.CRITICAL)
+        results = {}
+        try:
+            for mode in options['modes']:
+                if mode == 'pool' and settings_dict['ENGINE'] != POOL_ENGINE:
+                    self.stderr.write('pool: skipped, ENGINE of {} is not {}'.format(
+                        self.alias, POOL_ENGINE))
+                    continue
+                connections[self.alias].close()
+                if mode == 'new':
+                    settings_dict.update(CONN_MAX_AGE=0, POOL=None)
+                elif mode == 'persistent':
+                    settings_dict.update(CONN_MAX_AGE=options['max_age'], POOL=None)
+                else:
+                    settings_dict.update(CONN_MAX_AGE=0,
+                                         POOL=original['POOL'] or {'MIN': 1,
+                                                                   'MAX': options['threads']})
+                results[mode] = self.measure(options)
+        finally:
+            logging.disable(logging.NOTSET)
+            connection_created.disconnect(self.connected)
+            connections[self.alias].close()
+            settings_dict.update(original)
+
+        output = json.dumps({'path': options['path'], 'threads': options['threads'],
+                             'vendor': connections[self.alias].vendor, 'modes': results},
+                            indent=2, sort_keys=True)
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                f.write(output)
+        for mode, result in results.items():
+            self.stdout.write('{:<11} {:>4} {:>5} connections {:>8.2f}ms p50 {:>8.2f}ms p95 '
+                              '{:>8.2f}ms mean'.format(mode, result['status'],
+                                                       result['connections'], result['p50_ms'],
+                                                       result['p95_ms'], result['mean_ms']))
+
+    def connected(self, sender, connection, **kwargs):
+        #in the pool mode these are connections lent by the pool,not new ones
+        if connection.alias == self.alias:
+            with self.lock:
+                self.connections += 1
+
+    def measure(self, options):
+        #a new handler loads the middleware again,so DatabaseConnectionMiddleware sees the
+        #settings of this mode
+        handler = WSGIHandler()
+        self.lock = threading.Lock()
+        self.connections = 0
+        timings = []
+        statuses = set()
+
+        def request():
+            environ = {'PATH_INFO': options['path'], 'REQUEST_METHOD': 'GET',
+                       'HTTP_HOST': 'localhost'}
+            setup_testing_defaults(environ)
+            start = time.perf_counter()
+            response = handler(environ, lambda status, headers: statuses.add(status[:3]))
+            b''.join(response)
+            response.close()
+            return (time.perf_counter() - start) * 1000
+
+        def run(count):
+            try:
+                elapsed = [request() for i in range(count)]
+                with self.lock:
+                    timings.extend(elapsed)
+            finally:
+                #connections belong to the thread,a kept one is closed before the thread ends
+                connections.close_all()
+
+        #one request first,so imports and caches dont count
+        warmup = threading.Thread(target=run, args=(1,))
+        warmup.start()
+        warmup.join()
+        timings.clear()
+        statuses.clear()
+        self.connections = 0
+
+        threads = options['threads']
+        counts = [options['requests'] // threads + (i < options['requests'] % threads)
+                  for i in range(threads)]
+        workers = [threading.Thread(target=run, args=(count,)) for count in counts]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        timings.sort()
+        return {
+            'status': ','.join(sorted(statuses)),
+            'connections': self.connections,
+            'p50_ms': round(statistics.median(timings), 3),
+            'p95_ms': round(timings[min(len(timings) - 1, int(len(timings) * 0.95))], 3),
+            'mean_ms': round(statistics.mean(timings), 3),
+        }
@@ -0,0 +1,70 @@
+import threading
+import time
+import uuid
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import OperationalError, connection, transaction
+from django.db.models import Count
+
+from courses.models import Course, Module, Subject
+
+
+class Command(BaseCommand):
+    help = 'Measures Module insert throughput with concurrent writers on one course'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--writers', type=int, default=4)
+        parser.add_argument('--inserts', type=int, default=200,
+                            help='modules inserted by each writer')
+        parser.add_argument('--batch', type=int, default=0,
+                            help='insert with bulk_create in batches of this size')
+
+    def handle(self, *args, **options):
+        key = uuid.uuid4().hex[:12]
+        owner = User.objects.create(username='bench-{}'.format(key))
+        subject = Subject.objects.create(title='bench', slug='bench-{}'.format(key))
+        course = Course.objects.create(owner=owner, subject=subject, title='bench',
+                                       slug='bench-{}'.format(key), overview='')
+        retries = []
+        try:
+            writers = [threading.Thread(target=self.write, args=(course.id, options, retries))
+                       for i in range(options['writers'])]
+            start = time.perf_counter()
+            for writer in writers:
+                writer.start()
+            for writer in writers:
+                writer.join()
+            elapsed = time.perf_counter() - start
+
+            total = Module.objects.filter(course=course).count()
+            duplicates = (Module.objects.filter(course=course).order_by()
+                          .values('order').annotate(n=Count('id')).filter(n__gt=1).count())
+            self.stdout.write('{} modules in {:.2f}s: {:.0f} inserts/s, {} retries, '
+                              '{} duplicate orders'.format(total, elapsed, total / elapsed,
+                                                           len(retries), duplicates))
+        finally:
+            subject.delete()
+            owner.delete()
+
+    def write(self, course_id, options, retries):
+        #every thread gets its own database connection
+        try:
+            batch = options['batch']
+            remaining = options['inserts']
+            while remaining:
+                size = min(batch, remaining) if batch else 1
+                try:
+                    with transaction.atomic():
+                        if batch:
+                            Module.objects.bulk_create(
+                                [Module(course_id=course_id, title='bench') for i in range(size)])
+                        else:
+                            Module.objects.create(course_id=course_id, title='bench')
+                except OperationalError:
+                    #SQLite refuses a second writer instead of waiting for it
+                    retries.append(1)
+                    continue
+                remaining -= size
+        finally:
+            connection.close()
@@ -0,0 +1,301 @@
+import base64
+import json
+import logging
+import os
+import statistics
+import tempfile
+import time
+import tracemalloc
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.files.base import ContentFile
+from django.core.management.base import BaseCommand, CommandError
+from django.core.management.color import no_style
+from django.db import connection
+from django.test import Client
+from django.urls import reverse
+from django.test.utils import (override_settings, setup_test_environment,
+                               teardown_test_environment)
+from rest_framework.authtoken.models import Token
+
+from courses import search
+from courses.models import Subject, Course, Module, Content, Text, Video, Image, File
+from educa.metrics import recording
+
+PASSWORD = 'bench-password'
+
+ITEMS = [
+    (Text, {'content': 'Lorem ipsum dolor sit amet. ' * 20}),
+    (Video, {'url': 'https://www.youtube.com/watch?v=bench'}),
+    (Image, {'file': 'images/bench.png'}),
+    (File, {'file': 'files/bench.pdf'}),
+]
+
+
+class Command(BaseCommand):
+    help = ('Builds synthetic data in a test database and records the query count, latency '
+            'and peak memory of every course, student and API view. Fails when a view answers '
+            'with an error, its numbers would be no baseline')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--subjects', type=int, default=5)
+        parser.add_argument('--courses', type=int, default=10, help='courses per subject')
+        parser.add_argument('--modules', type=int, default=10, help='modules per course')
+        parser.add_argument('--contents', type=int, default=8,
+                            help='contents per module, cycling through the item types')
+        parser.add_argument('--students', type=int, default=50,
+                            help='students enrolled in the benchmarked course')
+        parser.add_argument('--repeat', type=int, default=20, help='requests per endpoint')
+        parser.add_argument('--output', '-o', help='file to write the JSON results to')
+        parser.add_argument('--baseline', help='results of a previous run to compare with')
+        parser.add_argument('--query-threshold', type=int, default=0,
+                            help='extra queries per endpoint allowed over the baseline')
+
+    def handle(self, *args, **options):
+        baseline = None
+        if options['baseline']:
+            with open(options['baseline']) as f:
+                baseline = json.load(f)['endpoints']
+
+        setup_test_environment()
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+        logging.disable(logging.CRITICAL)
+        #the uploaded and served files go to a temporary directory,not to MEDIA_ROOT
+        media = tempfile.TemporaryDirectory()
+        settings = override_settings(MEDIA_ROOT=media.name,
+                                     CHUNKED_UPLOAD_ROOT=os.path.join(media.name, 'uploads'))
+        settings.enable()
+        try:
+            self.seed(options)
+            results = {name: self.measure(endpoint, options['repeat'])
+                       for name, endpoint in self.endpoints().items()}
+        finally:
+            settings.disable()
+            media.cleanup()
+            logging.disable(logging.NOTSET)
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+
+        for name, result in sorted(results.items()):
+            self.stdout.write('{:<28} {:>4} {:>5} queries {:>8.1f}ms p50 {:>8.1f}ms p95 '
+                              '{:>8.0f}KB'.format(name, result['status'], result['queries'],
+                                                  result['p50_ms'], result['p95_ms'],
+                                                  result['peak_kb']))
+        failed = sorted(name for name, result in results.items() if result['status'] >= 400)
+        if failed:
+            raise CommandError('endpoints answered with an error, no results written: ' +
+                               ', '.join(failed))
+
+        scale = {key: options[key] for key in
+                 ('subjects', 'courses', 'modules', 'contents', 'students')}
+        output = json.dumps({'scale': scale, 'endpoints': results}, indent=2, sort_keys=True)
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                f.write(output)
+        if baseline is not None:
+            self.compare(results, baseline, options['query_threshold'])
+
+    def compare(self, results, baseline, threshold):
+        regressions = []
+        for name, result in sorted(results.items()):
+            if name not in baseline:
+                continue
+            for key in ('queries', 'queries_warm'):
+                if result[key] > baseline[name][key] + threshold:
+                    regressions.append('{} {}: {} -> {}'.format(
+                        name, key, baseline[name][key], result[key]))
+        if regressions:
+            raise CommandError('query count regressions:\n' + '\n'.join(regressions))
+        self.stdout.write('no query count regressions')
+
+    def measure(self, endpoint, repeat):
+        #the first request runs with cold caches,its query count is the one that regresses
+        #with an N+1.the last one shows what a warm request costs.the status is the first
+        #error of any request,or the status of the last one
+        timings = []
+        counts = []
+        status = None
+        for i in range(repeat):
+            #the async views run their queries in other threads,the recorder counts them too
+            with recording() as queries:
+                start = time.perf_counter()
+                response = self.request(endpoint)
+                timings.append((time.perf_counter() - start) * 1000)
+            counts.append(queries.count)
+            if status is None or status < 400:
+                status = response.status_code
+        tracemalloc.start()
+        self.request(endpoint)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        timings.sort()
+        return {
+            'status': status,
+            'queries': counts[0],
+            'queries_warm': counts[-1],
+            'p50_ms': round(statistics.median(timings), 2),
+            'p95_ms': round(timings[min(len(timings) - 1, int(len(timings) * 0.95))], 2),
+            'peak_kb': round(peak / 1024, 1),
+        }
+
+    def request(self, endpoint):
+        response = endpoint()
+        if response.streaming:
+            #a streamed body is produced while the server sends it,after the view returned
+            for chunk in response.streaming_content:
+                pass
+        response.close()
+        return response
+
+    def create(self, model, objs):
+        #bulk_create doesnt return primary keys on every backend,we give them ourselves on the
+        #empty test database and move the sequences past them
+        for pk, obj in enumerate(objs, model.objects.count() + 1):
+            obj.pk = pk
+        model.objects.bulk_create(objs, batch_size=500)
+        with connection.cursor() as cursor:
+            for sql in connection.ops.sequence_reset_sql(no_style(), [model]):
+                cursor.execute(sql)
+        return objs
+
+    def seed(self, options):
+        password = make_password(PASSWORD)
+        self.instructor = User.objects.create_superuser('bench-instructor', password=PASSWORD)
+        self.students = self.create(User, [
+            User(username='bench-student-{}'.format(i), password=password)
+            for i in range(max(options['students'], 1))])
+        subjects = self.create(Subject, [
+            Subject(title='Subject {}'.format(i), slug='subject-{}'.format(i))
+            for i in range(options['subjects'])])
+        courses = self.create(Course, [
+            Course(owner=self.instructor, subject=subject, title='Course {}'.format(i),
+                   slug='course-{}-{}'.format(subject.pk, i), overview='Overview')
+            for subject in subjects for i in range(options['courses'])])
+        modules = self.create(Module, [
+            Module(course=course, title='Module {}'.format(i), order=i)
+            for course in courses for i in range(options['modules'])])
+        items = {model: [] for model, fields in ITEMS}
+        slots = []
+        for module in modules:
+            for order in range(options['contents']):
+                model, fields = ITEMS[order % len(ITEMS)]
+                item = model(owner=self.instructor, title='Item', **fields)
+                items[model].append(item)
+                slots.append((module, order, item))
+        for model, objs in items.items():
+            self.create(model, objs)
+        self.create(Content, [Content(module=module, item=item, order=order)
+                              for module, order, item in slots])
+
+        self.course = courses[0]
+        self.module = modules[0]
+        self.course.students.add(*self.students)
+        self.text = Text.objects.create(owner=self.instructor, title='Text', content='Text')
+        Content.objects.create(module=self.module, item=self.text)
+        #a file the students download,the other File and Image items have no file on disk
+        self.file = File(owner=self.instructor, title='Handout')
+        self.file.file.save('handout.pdf', ContentFile(b'%PDF-1.4\n' + b'0' * 256 * 1024),
+                            save=False)
+        self.file.save()
+        Content.objects.create(module=self.module, item=self.file)
+        self.token = Token.objects.create(user=self.instructor)
+        #bulk_create sends no signals,the search index is built like rebuild_search_index does
+        search.rebuild()
+
+    def endpoints(self):
+        instructor = Client(raise_request_exception=False)
+        instructor.force_login(self.instructor)
+        student = Client(raise_request_exception=False)
+        student.force_login(self.students[0])
+        anonymous = Client(raise_request_exception=False)
+        auth = 'Basic ' + base64.b64encode('{}:{}'.format(
+            self.students[0].username, PASSWORD).encode()).decode()
+        token = 'Token ' + self.token.key
+        course, module = self.course, self.module
+        module_orders = dict(course.modules.values_list('id', 'order'))
+        content_orders = dict(module.contents.values_list('id', 'order'))
+        student_ids = [student.id for student in self.students]
+
+        def delete_content():
+            item = Text.objects.create(owner=self.instructor, title='Delete me', content='')
+            content = Content.objects.create(module=module, item=item)
+            return instructor.post(reverse('module_content_delete', args=[content.id]))
+
+        def chunked_upload():
+            #the three requests of an upload in one chunk:start,send and complete
+            data = b'0' * 64 * 1024
+            response = instructor.post(reverse('module_content_upload', args=[module.id, 'file']),
+                                       {'title': 'Upload', 'filename': 'upload.bin',
+                                        'size': len(data)})
+            if response.status_code >= 400:
+                return response
+            upload_id = response.json()['id']
+            response = instructor.generic(
+                'PUT', reverse('chunked_upload', args=[upload_id]), data,
+                content_type='application/octet-stream',
+                HTTP_CONTENT_RANGE='bytes 0-{}/{}'.format(len(data) - 1, len(data)))
+            if response.status_code >= 400:
+                return response
+            return instructor.post(reverse('chunked_upload_complete', args=[upload_id]))
+
+        return {
+            #courses/urls.py
+            'manage_course_list': lambda: instructor.get(reverse('manage_course_list')),
+            'course_create': lambda: instructor.get(reverse('course_create')),
+            'course_edit': lambda: instructor.get(reverse('course_edit', args=[course.id])),
+            'course_delete': lambda: instructor.get(reverse('course_delete', args=[course.id])),
+            'course_module_update': lambda: instructor.get(
+                reverse('course_module_update', args=[course.id])),
+            'module_content_create': lambda: instructor.get(
+                reverse('module_content_create', args=[module.id, 'text'])),
+            'module_content_update': lambda: instructor.get(
+                reverse('module_content_update', args=[module.id, 'text', self.text.id])),
+            'module_content_delete': delete_content,
+            'chunked_upload': chunked_upload,
+            'module_content_list': lambda: instructor.get(
+                reverse('module_content_list', args=[module.id])),
+            'module_order': lambda: instructor.post(
+                reverse('module_order'), json.dumps(module_orders),
+                content_type='application/json'),
+            'content_order': lambda: instructor.post(
+                reverse('content_order'), json.dumps(content_orders),
+                content_type='application/json'),
+            'course_list': lambda: anonymous.get(reverse('course_list')),
+            'course_list_subject': lambda: anonymous.get(
+                reverse('course_list_subject', args=[course.subject.slug])),
+            'course_detail': lambda: anonymous.get(reverse('course_detail', args=[course.slug])),
+            'course_search': lambda: anonymous.get(reverse('course_search'), {'q': 'course'}),
+            #students/urls.py
+            'student_registration': lambda: anonymous.get(reverse('student_registration')),
+            'student_enroll_course': lambda: student.post(
+                reverse('student_enroll_course'), {'course': course.id}),
+            'student_course_list': lambda: student.get(reverse('student_course_list')),
+            'student_course_detail': lambda: student.get(
+                reverse('student_course_detail', args=[course.id])),
+            'student_course_detail_module': lambda: student.get(
+                reverse('student_course_detail_module', args=[course.id, module.id])),
+            'student_item_file': lambda: student.get(
+                reverse('student_item_file', args=['file', self.file.id])),
+            'student_item_file_range': lambda: student.get(
+                reverse('student_item_file', args=['file', self.file.id]),
+                HTTP_RANGE='bytes=1024-65535'),
+            #courses/api/urls.py
+            'api_subject_list': lambda: anonymous.get(reverse('api:subject_list')),
+            'api_subject_detail': lambda: anonymous.get(
+                reverse('api:subject_detail', args=[course.subject_id])),
+            'api_course_enroll': lambda: anonymous.post(
+                reverse('api:course_enroll', args=[course.id]), HTTP_AUTHORIZATION=auth),
+            'api_course_list': lambda: anonymous.get(reverse('api:course-list')),
+            'api_course_detail': lambda: anonymous.get(
+                reverse('api:course-detail', args=[course.id])),
+            'api_course_contents': lambda: anonymous.get(
+                reverse('api:course-contents', args=[course.id]), HTTP_AUTHORIZATION=auth),
+            'api_course_bulk_enroll': lambda: anonymous.post(
+                reverse('api:course-bulk-enroll', args=[course.id]),
+                json.dumps({'user_ids': student_ids}), content_type='application/json',
+                HTTP_AUTHORIZATION=token),
+            'api_search': lambda: anonymous.get(reverse('api:search'), {'q': 'course'}),
+            'api_token': lambda: anonymous.post(reverse('api:token'), {
+                'username': self.students[0].username, 'password': PASSWORD}),
+        }
@@ -0,0 +1,76 @@
+import logging
+import re
+
+from django.contrib.contenttypes.models import ContentType
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import setup_test_environment, teardown_test_environment
+
+from courses.models import Course, Module, Content, Text
+
+#plan lines that mean a table is read whole or sorted after reading
+FULL_SCANS = {
+    'sqlite': re.compile(r'\bSCAN (TABLE )?\w+$|USE TEMP B-TREE'),
+    'postgresql': re.compile(r'Seq Scan|\bSort\b'),
+}
+
+
+class Command(BaseCommand):
+    help = ('Creates a test database from the migrations and checks that every hot query of '
+            'courses is answered from an index, without scanning or sorting a whole table')
+
+    def handle(self, *args, **options):
+        if connection.vendor not in FULL_SCANS:
+            raise CommandError('query plans are checked on SQLite and PostgreSQL only')
+        setup_test_environment()
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+        logging.disable(logging.CRITICAL)
+        try:
+            plans = {name: self.explain(qs) for name, qs in self.queries().items()}
+        finally:
+            logging.disable(logging.NOTSET)
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+
+        failures = []
+        for name, plan in sorted(plans.items()):
+            scans = [line.strip() for line in plan.splitlines()
+                     if FULL_SCANS[connection.vendor].search(line.strip())]
+            self.stdout.write('{:<24} {}'.format(name, 'FULL SCAN' if scans else 'index'))
+            if options['verbosity'] > 1 or scans:
+                self.stdout.write(plan)
+            if scans:
+                failures.append('{}: {}'.format(name, '; '.join(scans)))
+        if failures:
+            raise CommandError('queries without an index:\n' + '\n'.join(failures))
+        self.stdout.write('all queries use an index')
+
+    def explain(self, qs):
+        if connection.vendor == 'postgresql':
+            #the tables of the test database are empty and a sequential scan would win,we
+            #only ask whether an index can answer the query
+            with connection.cursor() as cursor:
+                cursor.execute('SET enable_seqscan = off')
+            try:
+                return qs.explain()
+            finally:
+                with connection.cursor() as cursor:
+                    cursor.execute('SET enable_seqscan = on')
+        return qs.explain()
+
+    def queries(self):
+        #the querysets are written as the views build them,ordered by the model Meta
+        return {
+            #CourseModuleUpdateView,the student course detail and the API
+            'course_modules': Module.objects.filter(course_id=1),
+            #ModuleContentListView and the student course detail
+            'module_contents': Content.objects.filter(module_id=1),
+            #the Content of an item,search.index_text and the item signal handlers.an item
+            #has one Content,there is nothing to sort
+            'item_content': Content.objects.filter(
+                content_type=ContentType.objects.get_for_model(Text), object_id=1).order_by(),
+            #ManageCourseListView
+            'owner_courses': Course.objects.filter(owner_id=1),
+            #catalog.get_courses for one subject
+            'subject_courses': Course.objects.filter(subject_id=1),
+        }
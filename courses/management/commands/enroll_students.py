@@ -0,0 +1,53 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from courses.enrollment import enroll_many, find_users, ENROLL_BATCH_SIZE
+from courses.models import Course
+
+
+class Command(BaseCommand):
+    help = ('Enrolls a cohort of users in a course, inserting the enrollments in batches. '
+            'The users are usernames, or ids with --ids, given as arguments or one per line '
+            'in a file')
+
+    def add_arguments(self, parser):
+        parser.add_argument('course', help='id or slug of the course')
+        parser.add_argument('users', nargs='*')
+        parser.add_argument('--ids', action='store_true', help='the users are given by id')
+        parser.add_argument('--file', help='file with one user per line, - for stdin')
+        parser.add_argument('--batch-size', type=int, default=ENROLL_BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        lookup = {'pk': options['course']} if options['course'].isdigit() else {
+            'slug': options['course']}
+        try:
+            course = Course.objects.get(**lookup)
+        except Course.DoesNotExist:
+            raise CommandError('course {} does not exist'.format(options['course']))
+
+        users = list(options['users'])
+        if options['file']:
+            input = sys.stdin if options['file'] == '-' else open(options['file'])
+            try:
+                users.extend(line.strip() for line in input if line.strip())
+            finally:
+                if input is not sys.stdin:
+                    input.close()
+        if not users:
+            raise CommandError('no users given')
+
+        if options['ids']:
+            try:
+                found, missing_ids, missing_usernames = find_users(
+                    user_ids=[int(user) for user in users])
+            except ValueError:
+                raise CommandError('--ids needs numeric user ids')
+        else:
+            found, missing_ids, missing_usernames = find_users(usernames=users)
+        added, enrolled = enroll_many(course, found, batch_size=options['batch_size'])
+
+        for user in missing_ids + missing_usernames:
+            self.stderr.write('user {} does not exist'.format(user))
+        self.stdout.write('{}: {} added, {} already enrolled, {} not found'.format(
+            course.slug, added, enrolled, len(missing_ids) + len(missing_usernames)))
@@ -0,0 +1,78 @@
+import json
+import sys
+import time
+
+from django.contrib.auth.models import User
+from django.contrib.contenttypes.models import ContentType
+from django.core.management.base import BaseCommand
+from django.core.serializers.json import DjangoJSONEncoder
+
+from courses.models import Subject, Course, Module, Content, Text, Video, Image, File
+
+#the items are written before the contents that point to them,so import_courses can remap
+#every object_id in a single pass over the file
+ITEM_MODELS = [Text, Video, Image, File]
+
+
+class Command(BaseCommand):
+    help = 'Exports courses with their modules and contents as newline-delimited JSON'
+
+    def add_arguments(self, parser):
+        parser.add_argument('slugs', nargs='*', help='slugs of the courses to export, all by default')
+        parser.add_argument('--output', '-o', default='-', help='file to write to, - for stdout')
+        parser.add_argument('--chunk-size', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        courses = Course.objects.all()
+        if options['slugs']:
+            courses = courses.filter(slug__in=options['slugs'])
+        contents = Content.objects.filter(module__course__in=courses)
+        querysets = [
+            Subject.objects.filter(id__in=courses.values('subject_id')),
+            courses,
+            Module.objects.filter(course__in=courses),
+        ]
+        for model in ITEM_MODELS:
+            content_type = ContentType.objects.get_for_model(model)
+            querysets.append(model.objects.filter(
+                id__in=contents.filter(content_type=content_type).values('object_id')))
+        querysets.append(contents)
+
+        output = sys.stdout if options['output'] == '-' else open(options['output'], 'w')
+        start = time.perf_counter()
+        total = 0
+        try:
+            for qs in querysets:
+                for record in self.records(qs, options['chunk_size']):
+                    output.write(json.dumps(record, cls=DjangoJSONEncoder) + '\n')
+                    total += 1
+        finally:
+            if output is not sys.stdout:
+                output.close()
+        elapsed = time.perf_counter() - start
+        self.stderr.write('exported {} rows in {:.1f}s ({:.0f} rows/s)'.format(
+            total, elapsed, total / elapsed if elapsed else total))
+
+    def records(self, qs, chunk_size):
+        model = qs.model
+        label = model._meta.label_lower
+        fields = [field for field in model._meta.concrete_fields if not field.primary_key]
+        values = [field.attname for field in fields]
+        #users and content types are written by their natural keys,their ids differ between
+        #databases
+        for field in fields:
+            if field.is_relation and field.related_model is User:
+                values.append('{}__username'.format(field.name))
+            elif field.is_relation and field.related_model is ContentType:
+                values.append('{}__model'.format(field.name))
+
+        for row in qs.order_by('pk').values('pk', *values).iterator(chunk_size=chunk_size):
+            data = {}
+            for field in fields:
+                if field.is_relation and field.related_model is User:
+                    data[field.name] = row['{}__username'.format(field.name)]
+                elif field.is_relation and field.related_model is ContentType:
+                    data[field.name] = row['{}__model'.format(field.name)]
+                else:
+                    data[field.name] = row[field.attname]
+            yield {'model': label, 'pk': row['pk'], 'fields': data}
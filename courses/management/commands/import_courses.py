@@ -0,0 +1,145 @@
+import json
+import sys
+import time
+
+from django.apps import apps
+from django.contrib.auth.models import User
+from django.contrib.contenttypes.models import ContentType
+from django.core.management.base import BaseCommand, CommandError
+from django.core.management.color import no_style
+from django.db import connection, transaction
+from django.db.models import Max
+
+from courses import search
+from courses.catalog import invalidate_catalog
+from courses.models import Subject, Course, Module, Content, Text, Video, Image, File
+from courses.versions import (bump_versions, course_version_key, module_version_key,
+                              touch_courses)
+
+#models in the order their rows have to be inserted
+MODELS = [Subject, Course, Module, Text, Video, Image, File, Content]
+
+
+class Command(BaseCommand):
+    help = 'Imports courses written by export_courses, inserting them in batches'
+
+    def add_arguments(self, parser):
+        parser.add_argument('input', help='file to read from, - for stdin')
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        self.batch_size = options['batch_size']
+        #new primary keys are given while reading,so the rows that point to them can be
+        #remapped before anything is inserted.ids maps each model to {old pk: new pk}
+        self.ids = {model: {} for model in MODELS}
+        self.pending = {model: [] for model in MODELS}
+        self.created = {model: 0 for model in MODELS}
+        self.users = {}
+        self.subjects = dict(Subject.objects.values_list('slug', 'id'))
+        self.start = time.perf_counter()
+
+        input = sys.stdin if options['input'] == '-' else open(options['input'])
+        try:
+            with transaction.atomic():
+                self.next_pk = {model: (model.objects.aggregate(last=Max('pk'))['last'] or 0) + 1
+                                for model in MODELS}
+                self.first_pk = dict(self.next_pk)
+                for number, line in enumerate(input, 1):
+                    if line.strip():
+                        try:
+                            self.read(json.loads(line))
+                        except (ValueError, KeyError, LookupError) as e:
+                            raise CommandError('line {}: {!r}'.format(number, e))
+                self.flush()
+                #the primary keys were given by us,move the sequences past them
+                with connection.cursor() as cursor:
+                    for sql in connection.ops.sequence_reset_sql(no_style(), MODELS):
+                        cursor.execute(sql)
+                self.refresh()
+        finally:
+            if input is not sys.stdin:
+                input.close()
+
+        for model in MODELS:
+            self.stdout.write('{}: {} created'.format(model._meta.label, self.created[model]))
+        self.progress()
+
+    def read(self, record):
+        model = apps.get_model(record['model'])
+        if model not in self.ids:
+            raise LookupError('unexpected model {}'.format(record['model']))
+        fields = record['fields']
+
+        if model is Subject and fields['slug'] in self.subjects:
+            #subjects are shared,we reuse the existing one with the same slug
+            self.ids[Subject][record['pk']] = self.subjects[fields['slug']]
+            return
+
+        obj = model(pk=self.next_pk[model])
+        self.next_pk[model] += 1
+        self.ids[model][record['pk']] = obj.pk
+        for field in model._meta.concrete_fields:
+            if field.primary_key or field.name not in fields:
+                continue
+            value = fields[field.name]
+            if value is not None and field.is_relation:
+                if field.related_model is User:
+                    value = self.user_id(value)
+                elif field.related_model is ContentType:
+                    value = ContentType.objects.get_by_natural_key('courses', value).id
+                else:
+                    value = self.ids[field.related_model][value]
+            setattr(obj, field.attname, value)
+        if model is Content:
+            item_model = ContentType.objects.get_for_id(obj.content_type_id).model_class()
+            obj.object_id = self.ids[item_model][obj.object_id]
+
+        self.pending[model].append(obj)
+        if len(self.pending[model]) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        #rows are inserted in dependency order.Module and Content rows without an order get
+        #consecutive ones from OrderedQuerySet.bulk_create
+        for model in MODELS:
+            if self.pending[model]:
+                model.objects.bulk_create(self.pending[model], batch_size=self.batch_size)
+                self.created[model] += len(self.pending[model])
+                self.pending[model] = []
+        self.progress()
+
+    def imported(self, model):
+        #the rows of a model were given consecutive primary keys
+        return model.objects.filter(pk__gte=self.first_pk[model], pk__lt=self.next_pk[model])
+
+    def refresh(self):
+        #bulk_create sends no signals,so we do what the handlers in signals.py would have done:
+        #the catalog cache forgets the subjects that got courses,the versions of the new courses
+        #and modules are bumped,the ids of deleted rows can be given again and their cached
+        #fragments must not be shown,and the new rows are indexed for search
+        courses = self.imported(Course)
+        invalidate_catalog(*courses.values_list('subject_id', flat=True).distinct())
+        touch_courses(courses)
+        bump_versions([course_version_key(pk) for pk in
+                       range(self.first_pk[Course], self.next_pk[Course])] +
+                      [module_version_key(pk) for pk in
+                       range(self.first_pk[Module], self.next_pk[Module])])
+        entries = search.add_entries(courses, self.imported(Module), self.imported(Text),
+                                     self.imported(Content), self.batch_size)
+        self.stdout.write('{} search entries added'.format(entries))
+
+    def progress(self):
+        total = sum(self.created.values())
+        elapsed = time.perf_counter() - self.start
+        self.stderr.write('{} rows in {:.1f}s ({:.0f} rows/s)'.format(
+            total, elapsed, total / elapsed if elapsed else total))
+
+    def user_id(self, username):
+        if username not in self.users:
+            user = User.objects.filter(username=username).first()
+            if user is None:
+                user = User(username=username)
+                user.set_unusable_password()
+                user.save()
+            self.users[username] = user.id
+        return self.users[username]
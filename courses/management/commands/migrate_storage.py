@@ -0,0 +1,110 @@
+import os
+import shutil
+import time
+
+from django.conf import settings
+from django.contrib.contenttypes.models import ContentType
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from courses.models import Content
+from courses.storage import hashed_storage, hash_file
+from courses.versions import bump_modules
+
+
+class Command(BaseCommand):
+    help = ('Moves the files of File and Image items stored before the hashed storage to '
+            'their content addressed names. Every file is read once in chunks to hash it and '
+            'linked or copied to its new name, identical files end up as one. With --prune the '
+            'hashed files that no item refers to anymore are removed')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500,
+                            help='files moved before the modules of their items are bumped')
+        parser.add_argument('--dry-run', action='store_true',
+                            help='only count the files that would be moved')
+        parser.add_argument('--prune', action='store_true')
+
+    def handle(self, *args, **options):
+        self.dry_run = options['dry_run']
+        self.counts = {'moved': 0, 'deduplicated': 0, 'missing': 0, 'bytes': 0, 'pruned': 0}
+        start = time.perf_counter()
+        for model, field in hashed_storage.fields():
+            names = [name for name in model.objects.exclude(**{field.name: ''})
+                     .values_list(field.name, flat=True).distinct().iterator()
+                     if not hashed_storage.is_hashed(name)]
+            self.stdout.write('{}: {} files to move'.format(model._meta.label, len(names)))
+            for start_index in range(0, len(names), options['batch_size']):
+                item_ids = []
+                for name in names[start_index:start_index + options['batch_size']]:
+                    item_ids += self.move(model, field, name)
+                if item_ids:
+                    #the rendered HTML of the items links to the file
+                    content_type = ContentType.objects.get_for_model(model)
+                    bump_modules(*Content.objects.filter(content_type=content_type,
+                                                         object_id__in=item_ids)
+                                 .values_list('module_id', flat=True).distinct())
+            if options['prune']:
+                self.prune(field.upload_to)
+        self.stdout.write('{moved} moved, {deduplicated} already stored, {missing} missing, '
+                          '{bytes} bytes, {pruned} pruned'.format(**self.counts) +
+                          ' in {:.1f}s'.format(time.perf_counter() - start) +
+                          (' (dry run)' if self.dry_run else ''))
+
+    def move(self, model, field, name):
+        path = hashed_storage.path(name)
+        if not os.path.exists(path):
+            self.stderr.write('{} is missing'.format(name))
+            self.counts['missing'] += 1
+            return []
+        self.counts['bytes'] += os.path.getsize(path)
+        if self.dry_run:
+            self.counts['moved'] += 1
+            return []
+        new_name = hashed_storage.hashed_name(name, hash_file(path))
+        new_path = hashed_storage.path(new_name)
+        if os.path.exists(new_path):
+            os.utime(new_path)
+            self.counts['deduplicated'] += 1
+        else:
+            os.makedirs(os.path.dirname(new_path), exist_ok=True)
+            try:
+                #a hard link costs no copy,and the old name stays until the rows are updated
+                os.link(path, new_path)
+            except OSError:
+                temporary = new_path + '.tmp'
+                shutil.copyfile(path, temporary)
+                os.replace(temporary, new_path)
+            self.counts['moved'] += 1
+        with transaction.atomic():
+            rows = model.objects.filter(**{field.name: name})
+            item_ids = list(rows.values_list('pk', flat=True))
+            #a new updated date gives the rendered HTML of the items a new cache key
+            rows.update(**{field.name: new_name, 'updated': timezone.now()})
+        os.remove(path)
+        return item_ids
+
+    def prune(self, prefix):
+        #the hashed storage deletes a file only when no row refers to it and it wasnt stored
+        #again recently
+        grace = getattr(settings, 'HASHED_STORAGE_GRACE_SECONDS', 600)
+        root = hashed_storage.path(prefix)
+        for directory, subdirectories, filenames in os.walk(root):
+            for filename in filenames:
+                path = os.path.join(directory, filename)
+                name = os.path.relpath(path, hashed_storage.location).replace(os.sep, '/')
+                if filename.startswith('.upload-'):
+                    #left by an upload that failed
+                    if time.time() - os.path.getmtime(path) >= grace and not self.dry_run:
+                        os.remove(path)
+                    continue
+                if not hashed_storage.is_hashed(name):
+                    continue
+                if self.dry_run:
+                    if not hashed_storage.references(name):
+                        self.counts['pruned'] += 1
+                    continue
+                hashed_storage.delete(name)
+                if not os.path.exists(path):
+                    self.counts['pruned'] += 1
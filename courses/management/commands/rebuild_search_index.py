@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from courses import search
+
+
+class Command(BaseCommand):
+    help = 'Indexes all courses, modules and text contents for search again'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            total = search.rebuild(options['batch_size'])
+        self.stdout.write('indexed {} entries'.format(total))
@@ -0,0 +1,127 @@
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from django.db import connections, transaction
+from django.utils import timezone
+
+from . import imaging
+from .models import Image, ImageVariant
+from .versions import bump_item_modules
+
+logger = logging.getLogger(__name__)
+
+#==image post processing.when an Image item is saved with a new file,process_image() hands the
+#resizing to a pool of worker processes(or threads) in this same server,there is no broker to
+#run.request workers only submit the job.when the pool is done,record_variants() stores the
+#variants and their dimensions and drops the cached HTML of the image,so render() picks the
+#variant up.it runs in the background thread below,not in the done callback:the callback runs
+#in a thread of the pool,or in the request thread when the job is done already,and neither
+#closes the database connections it would open
+
+_executor = None
+
+
+def get_executor():
+    global _executor
+    if _executor is None:
+        workers = settings.IMAGE_PROCESSING_WORKERS
+        if settings.IMAGE_PROCESSING_EXECUTOR == 'process':
+            _executor = ProcessPoolExecutor(max_workers=workers)
+        else:
+            _executor = ThreadPoolExecutor(max_workers=workers)
+    return _executor
+
+
+def process_image(image):
+    if imaging.Image is None:
+        logger.warning('Pillow is not installed, image %s is not processed', image.pk)
+        return None
+    try:
+        source = image.file.path
+    except NotImplementedError:
+        #the pipeline works on the local file of the image
+        return None
+    stem, ext = os.path.splitext(os.path.basename(image.file.name))
+    names = {name: default_storage.get_available_name(
+                 'images/variants/{}_{}{}'.format(stem, name, ext))
+             for name in settings.IMAGE_VARIANTS}
+    targets = {name: (default_storage.path(names[name]), size)
+               for name, size in settings.IMAGE_VARIANTS.items()}
+    future = get_executor().submit(imaging.resize, source, targets)
+    future.add_done_callback(partial(run_in_background, record_variants, image.pk, names))
+    return future
+
+
+def record_variants(image_id, names, future):
+    try:
+        sizes = future.result()
+    except Exception:
+        logger.exception('processing image %s failed', image_id)
+        return
+    with transaction.atomic():
+        image = Image.objects.filter(pk=image_id).first()
+        if image is None:
+            #deleted while it was processed
+            for name in names.values():
+                default_storage.delete(name)
+            return
+        for variant in image.variants.all():
+            default_storage.delete(variant.file.name)
+        image.variants.all().delete()
+        ImageVariant.objects.bulk_create([
+            ImageVariant(image=image, name=name, file=names[name],
+                         width=sizes[name][0], height=sizes[name][1])
+            for name in names])
+        #update() doesnt send post_save,which would process the image again
+        Image.objects.filter(pk=image_id).update(updated=timezone.now())
+    cache.delete(image.render_cache_key())
+    bump_item_modules(image)
+
+
+#==background thread.the database work that follows image processing and file removal runs in
+#one thread of this server,which closes its database connections after every job
+
+_background_executor = None
+
+
+def run_in_background(func, *args):
+    global _background_executor
+    if _background_executor is None:
+        _background_executor = ThreadPoolExecutor(max_workers=1)
+    return _background_executor.submit(_run_job, func, args)
+
+
+def _run_job(func, args):
+    try:
+        return func(*args)
+    except Exception:
+        logger.exception('background job %s failed', func.__name__)
+    finally:
+        connections.close_all()
+
+
+#==file removal.deleting a module or course in bulk leaves the files of its File and Image
+#items,the variants of the images and partial uploads.removing them from the storage can be
+#slow,so it is done in the background thread after the transaction commits
+
+
+def remove_files(files, paths=()):
+    #files are (storage,name) pairs,paths are local files outside the storage.the hashed
+    #storage counts the references to a file in the database before deleting it
+    return run_in_background(_remove_files, list(files), list(paths))
+
+
+def _remove_files(files, paths):
+    for storage, name in files:
+        try:
+            storage.delete(name)
+        except Exception:
+            logger.exception('removing %s failed', name)
+    for path in paths:
+        if os.path.exists(path):
+            os.remove(path)
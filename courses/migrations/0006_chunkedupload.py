@@ -0,0 +1,32 @@
+# Generated by Django 3.2.25 on 2026-10-18 19:23
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import uuid
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('courses', '0005_course_students'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ChunkedUpload',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('model_name', models.CharField(choices=[('file', 'File'), ('image', 'Image')], max_length=10)),
+                ('title', models.CharField(max_length=250)),
+                ('filename', models.CharField(max_length=255)),
+                ('size', models.BigIntegerField()),
+                ('sha256', models.CharField(blank=True, max_length=64)),
+                ('offset', models.BigIntegerField(default=0)),
+                ('created', models.DateTimeField(auto_now_add=True)),
+                ('module', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='chunked_uploads', to='courses.module')),
+                ('owner', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='chunked_uploads', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 3.2.25 on 2026-10-18 19:24
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0006_chunkedupload'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImageVariant',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=20)),
+                ('file', models.FileField(upload_to='images/variants')),
+                ('width', models.PositiveIntegerField()),
+                ('height', models.PositiveIntegerField()),
+                ('image', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='variants', to='courses.image')),
+            ],
+            options={
+                'unique_together': {('image', 'name')},
+            },
+        ),
+    ]
@@ -0,0 +1,76 @@
+# Generated by Django 3.2.25 on 2026-10-18 19:25
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+SQLITE_INDEX = [
+    "CREATE VIRTUAL TABLE courses_searchentry_fts USING fts5("
+    "title, body, content='courses_searchentry', content_rowid='id')",
+    "CREATE TRIGGER courses_searchentry_ai AFTER INSERT ON courses_searchentry BEGIN "
+    "INSERT INTO courses_searchentry_fts(rowid, title, body) "
+    "VALUES (new.id, new.title, new.body); END",
+    "CREATE TRIGGER courses_searchentry_ad AFTER DELETE ON courses_searchentry BEGIN "
+    "INSERT INTO courses_searchentry_fts(courses_searchentry_fts, rowid, title, body) "
+    "VALUES ('delete', old.id, old.title, old.body); END",
+    "CREATE TRIGGER courses_searchentry_au AFTER UPDATE ON courses_searchentry BEGIN "
+    "INSERT INTO courses_searchentry_fts(courses_searchentry_fts, rowid, title, body) "
+    "VALUES ('delete', old.id, old.title, old.body); "
+    "INSERT INTO courses_searchentry_fts(rowid, title, body) "
+    "VALUES (new.id, new.title, new.body); END",
+]
+
+SQLITE_DROP = [
+    "DROP TRIGGER IF EXISTS courses_searchentry_ai",
+    "DROP TRIGGER IF EXISTS courses_searchentry_ad",
+    "DROP TRIGGER IF EXISTS courses_searchentry_au",
+    "DROP TABLE IF EXISTS courses_searchentry_fts",
+]
+
+POSTGRESQL_INDEX = [
+    "CREATE INDEX courses_searchentry_vector ON courses_searchentry USING gin (("
+    "setweight(to_tsvector('english', title), 'A') || "
+    "setweight(to_tsvector('english', body), 'B')))",
+]
+
+POSTGRESQL_DROP = [
+    "DROP INDEX IF EXISTS courses_searchentry_vector",
+]
+
+
+def run(statements):
+    def operation(apps, schema_editor):
+        for sql in statements.get(schema_editor.connection.vendor, []):
+            schema_editor.execute(sql)
+    return operation
+
+#the full text index depends on the database:an FTS5 table kept up to date by triggers on
+#SQLite and a GIN index over the weighted tsvector of title and body on PostgreSQL
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0007_imagevariant'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchEntry',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('course', 'Course'), ('module', 'Module'), ('text', 'Text')], max_length=10)),
+                ('object_id', models.PositiveIntegerField()),
+                ('title', models.CharField(max_length=250)),
+                ('body', models.TextField(blank=True)),
+                ('course', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='search_entries', to='courses.course')),
+            ],
+            options={
+                'unique_together': {('kind', 'object_id')},
+            },
+        ),
+        migrations.RunPython(
+            run({'sqlite': SQLITE_INDEX, 'postgresql': POSTGRESQL_INDEX}),
+            run({'sqlite': SQLITE_DROP, 'postgresql': POSTGRESQL_DROP}),
+        ),
+    ]
@@ -0,0 +1,79 @@
+# Generated by Django 3.2.25 on 2026-10-18 19:28
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count
+import django.db.models.deletion
+
+
+def renumber_duplicates(apps, schema_editor):
+    #orders given before the unique constraints existed can repeat inside a course or module.
+    #the rows of those scopes get consecutive orders again,keeping their current sequence
+    for model_name, scope in (('Module', 'course_id'), ('Content', 'module_id')):
+        model = apps.get_model('courses', model_name)
+        duplicated = (model.objects.order_by().values(scope, 'order').annotate(n=Count('id'))
+                      .filter(n__gt=1).values_list(scope, flat=True).distinct())
+        for value in list(duplicated):
+            objs = list(model.objects.filter(**{scope: value}).order_by('order', 'id'))
+            for order, obj in enumerate(objs):
+                obj.order = order
+            model.objects.bulk_update(objs, ['order'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contenttypes', '0002_remove_content_type_name'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('courses', '0008_searchentry'),
+    ]
+
+    operations = [
+        migrations.RunPython(renumber_duplicates, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='content',
+            index=models.Index(fields=['content_type', 'object_id'], name='courses_content_item'),
+        ),
+        migrations.AddIndex(
+            model_name='course',
+            index=models.Index(fields=['owner', '-created'], name='courses_course_owner_created'),
+        ),
+        migrations.AddIndex(
+            model_name='course',
+            index=models.Index(fields=['subject', '-created'], name='courses_course_subject_created'),
+        ),
+        migrations.AddConstraint(
+            model_name='content',
+            constraint=models.UniqueConstraint(fields=('module', 'order'), name='courses_content_module_order'),
+        ),
+        migrations.AddConstraint(
+            model_name='module',
+            constraint=models.UniqueConstraint(fields=('course', 'order'), name='courses_module_course_order'),
+        ),
+        #the foreign key indexes are dropped once the composite indexes that replace them exist
+        migrations.AlterField(
+            model_name='content',
+            name='content_type',
+            field=models.ForeignKey(db_index=False, limit_choices_to={'model__in': ('text', 'video', 'image', 'file')}, on_delete=django.db.models.deletion.CASCADE, to='contenttypes.contenttype'),
+        ),
+        migrations.AlterField(
+            model_name='content',
+            name='module',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='contents', to='courses.module'),
+        ),
+        migrations.AlterField(
+            model_name='course',
+            name='owner',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='courses_created', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AlterField(
+            model_name='course',
+            name='subject',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='courses', to='courses.subject'),
+        ),
+        migrations.AlterField(
+            model_name='module',
+            name='course',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='modules', to='courses.course'),
+        ),
+    ]
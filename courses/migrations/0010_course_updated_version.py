@@ -0,0 +1,25 @@
+# Generated by Django 3.2.25 on 2026-10-18 21:05
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0009_hot_query_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='course',
+            name='updated',
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='course',
+            name='version',
+            field=models.PositiveIntegerField(default=1, editable=False),
+        ),
+    ]
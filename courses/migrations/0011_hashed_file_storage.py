@@ -0,0 +1,24 @@
+# Generated by Django 3.2.25 on 2026-10-18 19:56
+
+import courses.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0010_course_updated_version'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='file',
+            name='file',
+            field=models.FileField(db_index=True, storage=courses.storage.HashedStorage(), upload_to='files'),
+        ),
+        migrations.AlterField(
+            model_name='image',
+            name='file',
+            field=models.FileField(db_index=True, storage=courses.storage.HashedStorage(), upload_to='images'),
+        ),
+    ]
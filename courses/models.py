@@ -1,10 +1,21 @@
+import os
+import uuid
+
+from django.conf import settings
 from django.db import models
+from django.db.models import prefetch_related_objects
 from django.contrib.contenttypes.models import ContentType
 from django.contrib.contenttypes.fields import GenericForeignKey
 from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
 # Create your models here.
 
-from .fields import OrderField
+from .fields import OrderField, OrderedModel, OrderedQuerySet
+from .storage import hashed_storage
+
+ITEM_RENDER_TIMEOUT = 60 * 60 * 24
 class Subject(models.Model):
     title = models.CharField(max_length=200)
     slug=models.SlugField(max_length=200, unique=True)
@@ -16,33 +27,56 @@ class Subject(models.Model):
         return self.title
 
 class Course(models.Model):
-    owner=models.ForeignKey(User,related_name='courses_created',on_delete=models.CASCADE)
-    subject=models.ForeignKey(Subject,related_name='courses',on_delete=models.CASCADE)
+    owner=models.ForeignKey(User,related_name='courses_created',on_delete=models.CASCADE,
+                            db_index=False)
+    subject=models.ForeignKey(Subject,related_name='courses',on_delete=models.CASCADE,
+                              db_index=False)
     title=models.CharField(max_length=200)
     slug = models.SlugField(max_length=200, unique=True)
     overview = models.TextField()
     created = models.DateTimeField(auto_now_add=True)
+    updated = models.DateTimeField(auto_now=True)
+    version = models.PositiveIntegerField(default=1, editable=False)
     students = models.ManyToManyField(User, related_name='courses_joined',blank=True)
     #many to many rxnship for users to login
 
     class Meta:
         ordering = ['-created']
+        indexes = [
+            models.Index(fields=['owner', '-created'], name='courses_course_owner_created'),
+            models.Index(fields=['subject', '-created'], name='courses_course_subject_created'),
+        ]
 
     def __str__(self) -> str:
         return self.title
 
+#the instructor's course list filters by owner and the catalog by subject,both newest first.
+#the composite indexes serve the filter and the ordering,so the foreign keys dont get an
+#index of their own
+
+#updated and version change whenever the course,its modules,their contents or the content items
+#change,see touch_courses() in versions.py.updated is the latest of those changes,so the pages
+#and the API answer conditional requests reading only this row,see conditional.py
 
-class Module(models.Model):
-    course = models.ForeignKey(Course,related_name='modules',on_delete=models.CASCADE)
+
+class Module(OrderedModel):
+    course = models.ForeignKey(Course,related_name='modules',on_delete=models.CASCADE,
+                               db_index=False)
     title=models.CharField(max_length=200)
     description = models.TextField(blank=True)
     order = OrderField(blank=True, for_fields=['course'])
+
+    objects = OrderedQuerySet.as_manager()
+
     def __str__(self) -> str:
         return '{}. {}'.format(self.order, self.title)
 
 
     class Meta:
         ordering = ['order']
+        constraints = [
+            models.UniqueConstraint(fields=['course', 'order'], name='courses_module_course_order'),
+        ]
 
 #==we name the new field order,and we specify that the ordering is calculated with respect to 
 #the course by setting for_fields=['course].this means that the order for anew module willbe 
@@ -52,17 +86,51 @@ class Module(models.Model):
 
 #==module contents also need to follow a particular order. add an OrderField field to the
 #Content model
-class Content(models.Model):
-    module=models.ForeignKey(Module,related_name='contents',on_delete=models.CASCADE)
+class ContentQuerySet(OrderedQuerySet):
+    def with_items(self):
+        return self.prefetch_related('item')
+
+#with_items() loads the related Text,Video,Image or File objects of all the contents in the
+#queryset in one go.prefetching a GenericForeignKey groups the (content_type_id, object_id)
+#pairs by content type and runs a single IN query per concrete model,so the number of queries
+#no longer depends on the number of contents. use it as module.contents.with_items()
+
+
+class ItemForeignKey(GenericForeignKey):
+    def get_prefetch_queryset(self, instances, queryset=None):
+        result = super(ItemForeignKey, self).get_prefetch_queryset(instances, queryset)
+        prefetch_related_objects([item for item in result[0] if isinstance(item, Image)],
+                                 'variants')
+        return result
+
+#a lookup like 'item__variants' cant follow a GenericForeignKey to several models,the items
+#that arent images have no variants.the images are prefetched with their variants instead,so
+#rendering them reads the display variant without a query per image
+
+class Content(OrderedModel):
+    module=models.ForeignKey(Module,related_name='contents',on_delete=models.CASCADE,
+                             db_index=False)
     content_type=models.ForeignKey(ContentType,on_delete=models.CASCADE,limit_choices_to={
         'model__in':('text','video','image','file')
-    })
+    },db_index=False)
     object_id=models.PositiveIntegerField()
-    item=GenericForeignKey('content_type','object_id')
+    item=ItemForeignKey('content_type','object_id')
     order=OrderField(blank=True,for_fields=['module'])
 
+    objects = ContentQuerySet.as_manager()
+
     class Meta:
         ordering = ['order']
+        indexes = [
+            models.Index(fields=['content_type', 'object_id'], name='courses_content_item'),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=['module', 'order'], name='courses_content_module_order'),
+        ]
+
+#(course,order) and (module,order) are unique,the index behind each constraint also serves
+#course.modules.all() and module.contents.all() in their order.(content_type,object_id) finds
+#the Content of an item.check_query_plans checks that these queries use the indexes
 
 
 #we add alimit_choices_to argument to limit the ContentType objects that can be used for the 
@@ -94,20 +162,117 @@ class ItemBase(models.Model):
     def __str__(self) -> str:
         return self.title
 
+    def render_cache_key(self):
+        return 'item:{}:{}:{}'.format(self._meta.label_lower, self.pk, self.updated.timestamp())
+
+    def render(self):
+        key = self.render_cache_key()
+        html = cache.get(key)
+        if html is None:
+            html = render_to_string('courses/content/{}.html'.format(self._meta.model_name),
+                                    {'item': self})
+            cache.set(key, html, ITEM_RENDER_TIMEOUT)
+        return mark_safe(html)
+
+#render() returns the HTML of the item using the template courses/content/<model_name>.html.
+#the rendered HTML is the same for every student,so we cache it.the key includes the updated
+#date,so saving the item makes the next render() use a new key;the old entry is deleted by the
+#signal handlers in signals.py
+
 class Text(ItemBase):
     content=models.TextField()
 
 class File(ItemBase):
-    file=models.FileField(upload_to='files')
+    file=models.FileField(upload_to='files', storage=hashed_storage, db_index=True)
 
 class Image(ItemBase):
-    file=models.FileField(upload_to='images')
+    file=models.FileField(upload_to='images', storage=hashed_storage, db_index=True)
+
+    def get_variant(self, name):
+        for variant in self.variants.all():
+            if variant.name == name:
+                return variant
+        return None
+
+    def display_variant(self):
+        return self.get_variant(settings.IMAGE_DISPLAY_VARIANT)
 
 class Video(ItemBase):
     url=models.URLField()
 
+#resized copies of an Image,generated in the background by media.py after the image is saved
+class ImageVariant(models.Model):
+    image = models.ForeignKey(Image, related_name='variants', on_delete=models.CASCADE)
+    name = models.CharField(max_length=20)
+    file = models.FileField(upload_to='images/variants')
+    width = models.PositiveIntegerField()
+    height = models.PositiveIntegerField()
+
+    class Meta:
+        unique_together = ('image', 'name')
+
+    def __str__(self) -> str:
+        return '{} {}x{}'.format(self.name, self.width, self.height)
+
+#the files of File and Image items are stored by content,identical uploads share one file.the
+#index on the file columns counts the references to a file before it is deleted,see storage.py
+
 #WE HAVE DEFINED FOUR DIFFERENT content models,which inherit from the ItemBase abstract model
 #Text=>To store text content
 #file=>to store files,such as PDF
 #Image:to store image files
-#video=>store videos,we use an URLField to provide a video URL inorder to embed it
\ No newline at end of file
+#video=>store videos,we use an URLField to provide a video URL inorder to embed it
+
+
+#==search index.every course,module and text content has an entry with the text to search,
+#so one table can be searched for all of them.migration 0008 adds an FTS5 table on SQLite and
+#a GIN tsvector index on PostgreSQL over title and body,see search.py
+
+class SearchEntry(models.Model):
+    KIND_CHOICES = (
+        ('course', 'Course'),
+        ('module', 'Module'),
+        ('text', 'Text'),
+    )
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    object_id = models.PositiveIntegerField()
+    course = models.ForeignKey(Course, related_name='search_entries', on_delete=models.CASCADE)
+    title = models.CharField(max_length=250)
+    body = models.TextField(blank=True)
+
+    class Meta:
+        unique_together = ('kind', 'object_id')
+
+    def __str__(self) -> str:
+        return self.title
+
+
+#==chunked uploads.large files for File and Image contents are sent in chunks,each one in its
+#own short request.the chunks are written straight to a partial file under
+#CHUNKED_UPLOAD_ROOT;the item and its Content are only created when the upload is complete
+
+class ChunkedUpload(models.Model):
+    MODEL_CHOICES = (
+        ('file', 'File'),
+        ('image', 'Image'),
+    )
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    owner = models.ForeignKey(User, related_name='chunked_uploads', on_delete=models.CASCADE)
+    module = models.ForeignKey(Module, related_name='chunked_uploads', on_delete=models.CASCADE)
+    model_name = models.CharField(max_length=10, choices=MODEL_CHOICES)
+    title = models.CharField(max_length=250)
+    filename = models.CharField(max_length=255)
+    size = models.BigIntegerField()
+    sha256 = models.CharField(max_length=64, blank=True)
+    offset = models.BigIntegerField(default=0)
+    created = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self) -> str:
+        return self.filename
+
+    @property
+    def path(self):
+        return os.path.join(settings.CHUNKED_UPLOAD_ROOT, '{}.part'.format(self.id))
+
+#offset is the number of bytes received so far,a client that lost its connection asks for it
+#and resumes from there.sha256 is the checksum the client expects,it is checked at the end
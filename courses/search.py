@@ -0,0 +1,126 @@
+from itertools import chain, islice
+
+from django.contrib.contenttypes.models import ContentType
+from django.db import connections, router
+from django.db.models import Q
+
+from .models import Course, Module, Content, Text, SearchEntry
+
+#==full text search over courses,modules and text contents.the signal handlers in signals.py
+#keep the SearchEntry rows up to date when they are saved or deleted.search() uses the full text
+#index created by migration 0008 for the database in use:FTS5 on SQLite(local.py) and a GIN
+#indexed tsvector on PostgreSQL(pro.py).titles weigh more than bodies in the ranking
+
+SEARCH_CONFIG = 'english'
+
+SQLITE_SEARCH = """
+    SELECT rowid, -bm25(courses_searchentry_fts, 10.0, 1.0) AS rank
+    FROM courses_searchentry_fts WHERE courses_searchentry_fts MATCH %s
+    ORDER BY rank DESC LIMIT %s
+"""
+
+POSTGRESQL_VECTOR = ("setweight(to_tsvector('{config}', title), 'A') || "
+                     "setweight(to_tsvector('{config}', body), 'B')").format(config=SEARCH_CONFIG)
+
+#the vector is written as the expression of the GIN index,so the index is used
+POSTGRESQL_SEARCH = """
+    SELECT id, ts_rank({vector}, query) AS rank
+    FROM courses_searchentry, plainto_tsquery('{config}', %s) query
+    WHERE {vector} @@ query
+    ORDER BY rank DESC LIMIT %s
+""".format(vector=POSTGRESQL_VECTOR, config=SEARCH_CONFIG)
+
+
+def index_course(course):
+    SearchEntry.objects.update_or_create(kind='course', object_id=course.id, defaults={
+        'course': course, 'title': course.title, 'body': course.overview})
+
+
+def index_module(module):
+    SearchEntry.objects.update_or_create(kind='module', object_id=module.id, defaults={
+        'course_id': module.course_id, 'title': module.title, 'body': module.description})
+
+
+def index_text(text):
+    #a text is found through the course of the module it belongs to
+    content = Content.objects.filter(content_type=ContentType.objects.get_for_model(Text),
+                                     object_id=text.id).select_related('module').first()
+    if content is None:
+        remove('text', text.id)
+        return
+    SearchEntry.objects.update_or_create(kind='text', object_id=text.id, defaults={
+        'course_id': content.module.course_id, 'title': text.title, 'body': text.content})
+
+
+def remove(kind, object_id):
+    SearchEntry.objects.filter(kind=kind, object_id=object_id).delete()
+
+
+def fts5_query(query):
+    #every word is quoted,so the operators of the FTS5 query syntax are searched as text
+    return ' '.join('"{}"'.format(word.replace('"', '""')) for word in query.split())
+
+
+def search(query, limit=50):
+    #returns the matching entries,best first,with their course and a rank attribute
+    query = query.strip()
+    if not query:
+        return []
+    #the ids and the rows are read from the same database,a replica for the public search
+    alias = router.db_for_read(SearchEntry)
+    connection = connections[alias]
+    entries = SearchEntry.objects.using(alias)
+    if connection.vendor in ('sqlite', 'postgresql'):
+        if connection.vendor == 'sqlite':
+            sql, params = SQLITE_SEARCH, [fts5_query(query), limit]
+        else:
+            sql, params = POSTGRESQL_SEARCH, [query, limit]
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            ranks = dict(cursor.fetchall())
+    else:
+        #no full text index on other databases
+        ids = entries.filter(
+            Q(title__icontains=query) | Q(body__icontains=query)).values_list('id', flat=True)
+        ranks = {pk: 0 for pk in ids[:limit]}
+    entries = entries.select_related('course').in_bulk(list(ranks))
+    results = []
+    for pk, rank in sorted(ranks.items(), key=lambda item: -item[1]):
+        if pk in entries:
+            entries[pk].rank = rank
+            results.append(entries[pk])
+    return results
+
+
+def rebuild(batch_size=1000):
+    #indexes every course,module and text content again,used by rebuild_search_index
+    SearchEntry.objects.all().delete()
+    return add_entries(Course.objects.all(), Module.objects.all(), Text.objects.all(),
+                       Content.objects.all(), batch_size)
+
+
+def add_entries(courses, modules, texts, contents, batch_size=1000):
+    #indexes the given rows,which have no entries yet.the texts are indexed when one of the
+    #contents refers to them.used for rows created without signals,like bulk_create
+    texts_courses = {}
+    contents = contents.filter(content_type=ContentType.objects.get_for_model(Text))
+    for object_id, course_id in contents.values_list('object_id', 'module__course_id'):
+        texts_courses.setdefault(object_id, course_id)
+    entries = chain(
+        (SearchEntry(kind='course', object_id=course.id, course_id=course.id,
+                     title=course.title, body=course.overview)
+         for course in courses.iterator()),
+        (SearchEntry(kind='module', object_id=module.id, course_id=module.course_id,
+                     title=module.title, body=module.description)
+         for module in modules.iterator()),
+        (SearchEntry(kind='text', object_id=text.id, course_id=texts_courses[text.id],
+                     title=text.title, body=text.content)
+         for text in texts.iterator() if text.id in texts_courses),
+    )
+    total = 0
+    batch = list(islice(entries, batch_size))
+    while batch:
+        SearchEntry.objects.bulk_create(batch)
+        total += len(batch)
+        batch = list(islice(entries, batch_size))
+    return total
@@ -0,0 +1,136 @@
+import mimetypes
+import os
+import posixpath
+import re
+from urllib.parse import quote
+
+from django.conf import settings
+from django.http import FileResponse, Http404, HttpResponse
+from django.utils.http import http_date, parse_http_date_safe, quote_etag
+
+from .conditional import not_modified
+
+#==protected files.the view checks the access and serve_file() hands the transfer to the web
+#server:with SENDFILE_BACKEND 'x-accel-redirect' nginx sends the file from an internal location
+#(SENDFILE_URL),with 'x-sendfile' apache(mod_xsendfile) sends it from its path.the worker is
+#free as soon as the headers are sent,the server handles Range requests itself.
+#without a backend(runserver,or no web server in front) the file is sent by django:a
+#FileResponse over the open file,that the wsgi.file_wrapper of the server can send with
+#sendfile(),and a single Range answered with 206 and read in blocks,so the file never goes
+#into memory whole.that response holds the worker for the whole download
+
+RANGE = re.compile(r'^bytes=(\d*)-(\d*)$')
+HASHED_NAME = re.compile(r'/([0-9a-f]{64})(\.[^/]*)?$')
+
+
+class FileRange(object):
+    #the next length bytes of an open file.it has no fileno(),a server that would send the file
+    #with sendfile() to its end reads it in blocks instead
+    def __init__(self, file, length):
+        self.file = file
+        self.remaining = length
+
+    def read(self, size=-1):
+        if size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.file.read(size) if size else b''
+        self.remaining -= len(data)
+        return data
+
+    def close(self):
+        self.file.close()
+
+
+def parse_range(header, size):
+    #(start, end) of a single range,end excluded.None when the header asks for no single range
+    #and the whole file is sent.ValueError when no byte of the file is in the range
+    match = RANGE.match(header.replace(' ', ''))
+    if not match or not any(match.groups()):
+        return None
+    start, end = match.groups()
+    if not start:
+        #bytes=-500,the last 500 bytes.the last 0 bytes,or any bytes of an empty file,cant be
+        #sent
+        if not int(end) or not size:
+            raise ValueError('range not satisfiable')
+        return max(size - int(end), 0), size
+    start = int(start)
+    end = min(int(end) + 1, size) if end else size
+    if start >= size:
+        raise ValueError('range not satisfiable')
+    if end <= start:
+        return None
+    return start, end
+
+
+def content_disposition(filename, attachment=False):
+    disposition = 'attachment' if attachment else 'inline'
+    if not filename:
+        return disposition
+    try:
+        filename.encode('ascii')
+        return '{}; filename="{}"'.format(disposition, filename.replace('\\', '\\\\')
+                                          .replace('"', r'\"'))
+    except UnicodeEncodeError:
+        return "{}; filename*=utf-8''{}".format(disposition, quote(filename))
+
+
+def serve_file(request, storage, name, filename=None, attachment=False):
+    path = storage.path(name)
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        raise Http404('file not found')
+    #a hashed name is the checksum of the content,it makes a strong ETag
+    hashed = HASHED_NAME.search(name)
+    etag = quote_etag(hashed.group(1)) if hashed else None
+    modified = int(stat.st_mtime)
+
+    response = not_modified(request, etag, modified)
+    if response is None:
+        backend = getattr(settings, 'SENDFILE_BACKEND', None)
+        if backend == 'x-accel-redirect':
+            response = HttpResponse()
+            response['X-Accel-Redirect'] = quote(posixpath.join(settings.SENDFILE_URL, name))
+        elif backend == 'x-sendfile':
+            response = HttpResponse()
+            response['X-Sendfile'] = path
+        else:
+            response = ranged_response(request, path, stat.st_size, etag, modified)
+        #the content type of the name,the web server would send text/html from the response
+        content_type, encoding = mimetypes.guess_type(name)
+        response['Content-Type'] = content_type or 'application/octet-stream'
+        response['Content-Disposition'] = content_disposition(filename, attachment)
+    if etag:
+        response['ETag'] = etag
+    response['Last-Modified'] = http_date(modified)
+    #only the users with access get the file,shared caches must not keep it
+    response['Cache-Control'] = 'private, max-age=3600'
+    return response
+
+
+def ranged_response(request, path, size, etag, modified):
+    header = request.META.get('HTTP_RANGE', '')
+    if_range = request.META.get('HTTP_IF_RANGE')
+    if header and if_range:
+        #the range is for the version of the file the client has,a changed file is sent whole
+        if if_range != etag and parse_http_date_safe(if_range) != modified:
+            header = ''
+    try:
+        byte_range = parse_range(header, size) if header else None
+    except ValueError:
+        response = HttpResponse(status=416)
+        response['Content-Range'] = 'bytes */{}'.format(size)
+        return response
+
+    file = open(path, 'rb')
+    if byte_range is None or byte_range == (0, size):
+        response = FileResponse(file)
+    else:
+        start, end = byte_range
+        file.seek(start)
+        response = FileResponse(FileRange(file, end - start), status=206)
+        response['Content-Range'] = 'bytes {}-{}/{}'.format(start, end - 1, size)
+        response['Content-Length'] = end - start
+    response['Accept-Ranges'] = 'bytes'
+    return response
@@ -0,0 +1,190 @@
+import os
+
+from django.db.models.signals import pre_save, post_save, post_delete, m2m_changed
+from django.core.cache import cache
+from django.db import transaction
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from . import search
+from .api.authentication import forget_token
+from .catalog import invalidate_catalog
+from .deletion import in_bulk_deletion
+from .enrollment import invalidate_enrollments
+from .fields import post_reorder
+from .models import Subject, Course, Module, Content, Text, File, Image, Video, ChunkedUpload
+from .media import process_image
+from .versions import bump_courses, bump_modules, bump_item_modules, touch_courses
+
+
+@receiver(post_save, sender=Subject)
+@receiver(post_delete, sender=Subject)
+def subject_changed(sender, instance, **kwargs):
+    invalidate_catalog(instance.id)
+    if kwargs.get('created') is False:
+        #the course pages show the title of their subject
+        touch_courses(Course.objects.filter(subject_id=instance.id))
+
+
+@receiver(pre_save, sender=Course)
+def course_saving(sender, instance, **kwargs):
+    #remember the subject stored in the database,a course moved to another subject has to
+    #leave the cached list of its old subject too
+    instance._catalog_subject_id = None
+    if instance.pk:
+        instance._catalog_subject_id = Course.objects.filter(
+            pk=instance.pk).values_list('subject_id', flat=True).first()
+
+
+@receiver(post_save, sender=Course)
+@receiver(post_delete, sender=Course)
+def course_changed(sender, instance, **kwargs):
+    invalidate_catalog(instance.subject_id, getattr(instance, '_catalog_subject_id', None))
+
+
+@receiver(post_save, sender=Module)
+@receiver(post_delete, sender=Module)
+def module_changed(sender, instance, **kwargs):
+    if in_bulk_deletion():
+        return
+    bump_courses(instance.course_id)
+    #only the number of modules of the course is shown in the catalog
+    if kwargs.get('created', True):
+        subject_id = Course.objects.filter(
+            pk=instance.course_id).values_list('subject_id', flat=True).first()
+        invalidate_catalog(subject_id)
+
+#post_delete doesnt send created,so deleted modules always invalidate.when a whole course is
+#deleted its modules are gone with it and the lookup returns None,the course handler takes
+#care of its subject.the post_delete handlers do nothing for the rows deleted by deletion.py,
+#it does their work once for all of them
+
+
+@receiver(m2m_changed, sender=Course.students.through)
+def enrollments_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if reverse:
+        #user.courses_joined was changed,only this user is affected
+        if action.startswith('post_'):
+            invalidate_enrollments(instance.pk)
+    elif action == 'pre_clear':
+        #course.students.clear() doesnt tell which students it removes
+        invalidate_enrollments(*instance.students.values_list('id', flat=True))
+    elif action in ('post_add', 'post_remove'):
+        invalidate_enrollments(*pk_set)
+
+
+@receiver(post_save, sender=Content)
+@receiver(post_delete, sender=Content)
+def content_changed(sender, instance, **kwargs):
+    if in_bulk_deletion():
+        return
+    bump_modules(instance.module_id)
+
+
+@receiver(post_reorder, sender=Module)
+def modules_reordered(sender, instances, **kwargs):
+    bump_courses(*[module.course_id for module in instances])
+
+
+@receiver(post_reorder, sender=Content)
+def contents_reordered(sender, instances, **kwargs):
+    bump_modules(*[content.module_id for content in instances])
+
+
+def item_saving(sender, instance, **kwargs):
+    #updated still holds the date the item was loaded with,so this is the key of the HTML
+    #rendered before this change
+    if instance.pk and instance.updated:
+        cache.delete(instance.render_cache_key())
+
+
+def item_saved(sender, instance, created, **kwargs):
+    #a new item has no contents yet,the Content created for it bumps its module
+    if not created:
+        bump_item_modules(instance)
+
+
+def item_deleted(sender, instance, **kwargs):
+    if in_bulk_deletion():
+        return
+    cache.delete(instance.render_cache_key())
+    bump_item_modules(instance)
+
+
+for model in (Text, File, Image, Video):
+    pre_save.connect(item_saving, sender=model)
+    post_save.connect(item_saved, sender=model)
+    post_delete.connect(item_deleted, sender=model)
+
+
+@receiver(pre_save, sender=Image)
+def image_saving(sender, instance, **kwargs):
+    instance._file_changed = not instance.pk or not Image.objects.filter(
+        pk=instance.pk, file=instance.file.name).exists()
+
+
+@receiver(post_save, sender=Image)
+def image_saved(sender, instance, **kwargs):
+    #the variants are generated in the background once the image is committed
+    if getattr(instance, '_file_changed', True):
+        transaction.on_commit(lambda: process_image(instance))
+
+
+@receiver(post_delete, sender=ChunkedUpload)
+def upload_deleted(sender, instance, **kwargs):
+    #a completed upload was moved to the storage already,a discarded one leaves its partial file.
+    #the files of the uploads of deleted modules are removed after the commit,see deletion.py
+    if in_bulk_deletion():
+        return
+    if os.path.exists(instance.path):
+        os.remove(instance.path)
+
+
+#==search index
+@receiver(post_save, sender=Course)
+def course_indexed(sender, instance, **kwargs):
+    search.index_course(instance)
+
+
+@receiver(post_save, sender=Module)
+def module_indexed(sender, instance, **kwargs):
+    search.index_module(instance)
+
+
+@receiver(post_delete, sender=Module)
+def module_unindexed(sender, instance, **kwargs):
+    if in_bulk_deletion():
+        return
+    search.remove('module', instance.id)
+
+
+@receiver(post_save, sender=Text)
+def text_indexed(sender, instance, created, **kwargs):
+    #a new text is indexed when its Content is created
+    if not created:
+        search.index_text(instance)
+
+
+@receiver(post_delete, sender=Text)
+def text_unindexed(sender, instance, **kwargs):
+    if in_bulk_deletion():
+        return
+    search.remove('text', instance.id)
+
+
+@receiver(post_save, sender=Content)
+@receiver(post_delete, sender=Content)
+def content_indexed(sender, instance, **kwargs):
+    if in_bulk_deletion():
+        return
+    if instance.content_type.model == 'text' and kwargs.get('created', True):
+        text = Text.objects.filter(pk=instance.object_id).first()
+        if text is not None:
+            search.index_text(text)
+
+#the entries of a deleted course are deleted with it by the course foreign key
+
+
+@receiver(post_delete, sender=Token)
+def token_deleted(sender, instance, **kwargs):
+    forget_token(instance.key)
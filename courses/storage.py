@@ -0,0 +1,117 @@
+import hashlib
+import os
+import posixpath
+import re
+import time
+import uuid
+
+from django.apps import apps
+from django.conf import settings
+from django.core.files.move import file_move_safe
+from django.core.files.storage import FileSystemStorage
+from django.db.models import FileField
+from django.utils.deconstruct import deconstructible
+
+#==content addressed storage for the files of File and Image items.a file is stored under the
+#sha256 of its content,sharded in two levels of directories:files/ab/cd/abcd...ef.pdf.so no
+#directory grows past a few thousand entries,and the same PDF uploaded again is stored once;
+#the rows of both items point to the same name.the hash is computed while the upload is
+#written,in chunks.
+#a file is deleted only when no row of a field that uses this storage refers to it anymore,the
+#references are counted on the indexed file columns.a file that was stored again in the last
+#HASHED_STORAGE_GRACE_SECONDS is kept,the row of that upload may not be committed yet.
+#migrate_storage moves the files stored before and removes the ones nobody refers to
+
+CHUNK_SIZE = 1024 * 1024
+HASHED_NAME = re.compile(r'(^|/)[0-9a-f]{2}/[0-9a-f]{2}/[0-9a-f]{64}(\.[^/]*)?$')
+
+
+@deconstructible
+class HashedStorage(FileSystemStorage):
+    def hashed_name(self, name, digest):
+        #keeps the directory given by upload_to and the extension,the web server uses it for
+        #the content type
+        directory = posixpath.dirname(name.replace('\\', '/'))
+        ext = os.path.splitext(name)[1].lower()[:10]
+        return posixpath.join(directory, digest[:2], digest[2:4], digest + ext)
+
+    def is_hashed(self, name):
+        return bool(HASHED_NAME.search(name))
+
+    def get_available_name(self, name, max_length=None):
+        #the name is decided by the content in _save(),files with the same name are the same
+        return name
+
+    def _save(self, name, content):
+        directory = self.path(posixpath.dirname(name))
+        os.makedirs(directory, exist_ok=True)
+        temporary = None
+        digest = getattr(content, 'sha256', None)
+        if hasattr(content, 'temporary_file_path'):
+            #a file on disk already,it is read to hash it and moved like FileSystemStorage does
+            source = content.temporary_file_path()
+            if digest is None:
+                digest = hash_file(source)
+        else:
+            sha256 = hashlib.sha256()
+            temporary = os.path.join(directory, '.upload-{}'.format(uuid.uuid4().hex))
+            #created like FileSystemStorage creates its files,with the permissions of the umask
+            fd = os.open(temporary, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o666)
+            try:
+                with os.fdopen(fd, 'wb') as f:
+                    for chunk in content.chunks():
+                        sha256.update(chunk)
+                        f.write(chunk)
+            except BaseException:
+                os.remove(temporary)
+                raise
+            source, digest = temporary, sha256.hexdigest()
+
+        name = self.hashed_name(name, digest)
+        path = self.path(name)
+        if os.path.exists(path):
+            #stored already,only the time is updated so a pending delete keeps it
+            os.utime(path)
+            if temporary:
+                os.remove(temporary)
+            return name
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        if temporary:
+            os.replace(temporary, path)
+        else:
+            file_move_safe(source, path, allow_overwrite=True)
+        if self.file_permissions_mode is not None:
+            os.chmod(path, self.file_permissions_mode)
+        return name
+
+    def fields(self):
+        return [(model, field) for model in apps.get_models()
+                for field in model._meta.concrete_fields
+                if isinstance(field, FileField) and field.storage is self]
+
+    def references(self, name):
+        return sum(model._default_manager.filter(**{field.name: name}).count()
+                   for model, field in self.fields())
+
+    def delete(self, name):
+        if not self.is_hashed(name):
+            return super(HashedStorage, self).delete(name)
+        if self.references(name):
+            return
+        try:
+            age = time.time() - os.path.getmtime(self.path(name))
+        except FileNotFoundError:
+            return
+        if age >= getattr(settings, 'HASHED_STORAGE_GRACE_SECONDS', 600):
+            super(HashedStorage, self).delete(name)
+
+
+def hash_file(path):
+    sha256 = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+            sha256.update(chunk)
+    return sha256.hexdigest()
+
+
+hashed_storage = HashedStorage()
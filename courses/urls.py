@@ -11,6 +11,13 @@ urlpatterns = [
             views.ContentCreateUpdateView.as_view(),
             name='module_content_create'
         ),
+    path('module/<int:module_id>/content/<model_name>/upload/',
+            views.ChunkedUploadCreateView.as_view(),
+            name='module_content_upload'
+        ),
+    path('upload/<uuid:upload_id>/',views.ChunkedUploadView.as_view(),name='chunked_upload'),
+    path('upload/<uuid:upload_id>/complete/',views.ChunkedUploadCompleteView.as_view(),
+        name='chunked_upload_complete'),
     path('module/<int:module_id>/content/<model_name>/<id>/',
         views.ContentCreateUpdateView.as_view(),
         name='module_content_update'
@@ -22,7 +29,8 @@ urlpatterns = [
         ),
     path('module/order/',views.ModuleOrderView.as_view(),name='module_order'),
     path('content/order/',views.ContentOrderView.as_view(),name='content_order'),
-    path('subject/<slug:subject>)/',views.CourseListView.as_view(),name='course_list_subject'),
+    path('subject/<slug:subject>/',views.CourseListView.as_view(),name='course_list_subject'),
+    path('search/',views.CourseSearchView.as_view(),name='course_search'),
     path('<slug:slug>/',views.CourseDetailView.as_view(),name='course_detail'),
 ]
 #module_content_create => to create new ext,video,image, or file objects and add them to a module
@@ -0,0 +1,77 @@
+import time
+
+from django.contrib.contenttypes.models import ContentType
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Course, Content
+
+#every course and module has a version number kept in the cache.the student pages use it in
+#the keys of their cached fragments,so bumping the version makes the next request render the
+#fragment again while every student shares the same cached HTML until then.the signal handlers
+#in signals.py bump the versions when modules,contents or items change or are reordered.
+#a version that is not in the cache starts at the current time in milliseconds,so a version
+#evicted from the cache never goes back to a number an old fragment was cached with.
+#bumping also touches the courses in the database:their version and updated columns are the
+#validators of the conditional requests,see conditional.py.they are written in the transaction
+#of the change,the cached versions only once it is committed
+
+
+def course_version_key(course_id):
+    return 'version:course:{}'.format(course_id)
+
+
+def module_version_key(module_id):
+    return 'version:module:{}'.format(module_id)
+
+
+def get_version(key):
+    return cache.get_or_set(key, lambda: int(time.time() * 1000), None)
+
+
+def bump_version(key):
+    try:
+        cache.incr(key)
+    except ValueError:
+        #not cached yet,the next get_version() starts a new one
+        pass
+
+
+def course_version(course_id):
+    return get_version(course_version_key(course_id))
+
+
+def module_version(module_id):
+    return get_version(module_version_key(module_id))
+
+
+def bump_versions(keys):
+    def bump():
+        for key in keys:
+            bump_version(key)
+    transaction.on_commit(bump)
+
+
+def touch_courses(courses):
+    courses.update(version=F('version') + 1, updated=timezone.now())
+
+
+def bump_courses(*course_ids):
+    if course_ids:
+        touch_courses(Course.objects.filter(pk__in=set(course_ids)))
+    bump_versions([course_version_key(course_id) for course_id in set(course_ids)])
+
+
+def bump_modules(*module_ids):
+    if module_ids:
+        touch_courses(Course.objects.filter(modules__in=set(module_ids)))
+    bump_versions([module_version_key(module_id) for module_id in set(module_ids)])
+
+
+def bump_item_modules(item):
+    #an item can be the content of several modules
+    content_type = ContentType.objects.get_for_model(item)
+    bump_modules(*Content.objects.filter(content_type=content_type, object_id=item.pk)
+                 .values_list('module_id', flat=True))
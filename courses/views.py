@@ -1,14 +1,27 @@
-from django.db.models import Count
+import asyncio
+import hashlib
+import os
+import re
+
+from django.conf import settings
+from django.core.files import File
+from django.db import IntegrityError, transaction
+from django.db.models import OuterRef, Subquery
+from django.http import Http404
 from django.shortcuts import render,redirect, get_object_or_404
 from django.views.generic.list import ListView
 from .models import Course,Subject
+from . import catalog, search
+from .asynchronous import AsyncViewMixin, query
+from .conditional import course_etag, last_modified, not_modified, set_validators
+from .deletion import delete_contents, delete_modules, delete_courses
 from students.forms import CourseEnrollForm
 
 
 
 
 from django.views.generic.base import TemplateResponseMixin,View
-from .forms import ModuleFormSet
+from .forms import ModuleFormSet, ChunkedUploadForm
 
 from django.contrib.auth.mixins import LoginRequiredMixin,PermissionRequiredMixin
 
@@ -17,7 +30,7 @@ from django.views.generic.edit import CreateView,UpdateView, DeleteView
 from django.views.generic.detail import DetailView
 from django.forms.models import modelform_factory
 from django.apps import apps
-from .models import Module, Content
+from .models import Module, Content, ChunkedUpload
 # Create your views here.
 
 class ManageCourseListView(ListView):
@@ -67,6 +80,13 @@ class OwnerCourseEditMixin(OwnerCourseMixin, OwnerEditMixin):
 class ManageCourseListView(OwnerCourseMixin, ListView):
     template_name='courses/manage/course/list.html'
 
+    def get_queryset(self):
+        first_module = Module.objects.filter(course=OuterRef('pk')).order_by('order')
+        return super(ManageCourseListView, self).get_queryset().annotate(
+            first_module_id=Subquery(first_module.values('id')[:1]))
+    #the link to the contents of the first module of every course comes with the courses in
+    #one query,instead of two queries per course in the template
+
 class CourseCreateView(PermissionRequiredMixin,OwnerCourseEditMixin,CreateView):
     permission_required='courses.add_course'
 
@@ -80,6 +100,13 @@ class CourseDeleteView(PermissionRequiredMixin,OwnerCourseMixin,DeleteView):
     success_url=reverse_lazy('manage_course_list')
     permission_required='courses.delete_course'
 
+    def delete(self, request, *args, **kwargs):
+        self.object = self.get_object()
+        delete_courses(Course.objects.filter(pk=self.object.pk))
+        return redirect(self.get_success_url())
+    #delete_courses() removes the modules,contents and items of the course with a few
+    #statements,the items would be left behind by the cascade of delete()
+
 #get_queryset()=this mthd is used by the views to get the base queryset our mixin will 
 #override this methodto filter objects by the owner attribute to retrieve objects
 #that belong to the current user(request.user)
@@ -120,7 +147,14 @@ class CourseModuleUpdateView(TemplateResponseMixin, View):
     def post(self, request,*args, **kwargs):
         formset = self.get_formset(data=request.POST)
         if formset.is_valid():
-            formset.save()
+            with transaction.atomic():
+                for module in formset.save(commit=False):
+                    module.save()
+                delete_modules(Module.objects.filter(
+                    pk__in=[module.pk for module in formset.deleted_objects]))
+            #we save inside a transaction so the lock OrderField takes on the course is held
+            #until the new modules are inserted.the modules marked for deletion are deleted
+            #with their contents and items by delete_modules()
             return redirect('manage_course_list')
         return self.render_to_response({'course':self.course, 'formset':formset})
 
@@ -196,10 +230,11 @@ class ContentCreateUpdateView(TemplateResponseMixin, View):
         if form.is_valid():
             obj = form.save(commit=False)
             obj.owner = request.user
-            obj.save()
-            if not id:
-                #new content
-                Content.objects.create(module=self.module,item=obj)
+            with transaction.atomic():
+                obj.save()
+                if not id:
+                    #new content
+                    Content.objects.create(module=self.module,item=obj)
             return redirect('module_content_list', self.module.id)
         return self.render_to_response({'fomr':form, 'object':self.obj})
     #executed when apost request is received.we build the modelform passing any submitted
@@ -213,14 +248,13 @@ class ContentCreateUpdateView(TemplateResponseMixin, View):
 class ContentDeleteView(View):
     def post(self, request, id):
         content = get_object_or_404(Content,id=id,module__course__owner=request.user)
-        module=content.module
-        content.item.delete()
-        content.delete()
-        return redirect('module_content_list', module.id)
+        delete_contents(Content.objects.filter(pk=content.pk))
+        return redirect('module_content_list', content.module_id)
 
 #view to display all modules for a course and list contents for aspecific module.
 #retrieves the Content object with the given ID,it delets the related Text,Video,Image
-#or File object, and finally it deletes the Content object and redirects the user to the
+#or File object(its file is removed in the background), and finally it deletes the Content
+#object and redirects the user to the
 #module_content_list URL to list  the other contents of the module
 
 #===viwe to display all modules for acourse and list contents for aspecific module
@@ -229,8 +263,13 @@ class ModuleContentListView(TemplateResponseMixin,View):
     template_name = 'courses/manage/module/content_list.html'
 
     def get(self, request, module_id):
-        module = get_object_or_404(Module, id=module_id,course__owner=request.user)
-        return self.render_to_response({'module': module})
+        module = get_object_or_404(Module.objects.select_related('course'), id=module_id,
+                                   course__owner=request.user)
+        contents = module.contents.with_items()
+        return self.render_to_response({'module': module, 'contents': contents})
+    #we pass the module contents with their items prefetched,so the template doesnt run a
+    #query for every content.item it renders:one query per item type whatever the number of
+    #contents.the course of the module comes with it
 
 
 
@@ -245,22 +284,164 @@ class ModuleContentListView(TemplateResponseMixin,View):
 # CSrfExemptMixin= to avoid checking the CSRF token in the POST requests.we need this
 #to perform ajax post requests without having to generate a csrf_token.
 
+from braces.views import CsrfExemptMixin, JsonRequestResponseMixin, JSONResponseMixin
+
 
-from braces.views import CsrfExemptMixin, JsonRequestResponseMixin
 
-class ModuleOrderView(CsrfExemptMixin, JsonRequestResponseMixin,View):
+def read_orders(data):
+    #{"<id>": <order>} as the sortable scripts send it.None when the payload isnt one
+    if not isinstance(data, dict):
+        return None
+    try:
+        orders = {int(pk): order for pk, order in data.items()}
+    except (TypeError, ValueError):
+        return None
+    if not all(type(order) is int and order >= 0 for order in orders.values()):
+        return None
+    return orders
+
+
+class OrderView(CsrfExemptMixin, JsonRequestResponseMixin, View):
+    model = None
+    owner_field = 'course__owner'
+
+    def get_queryset(self):
+        return self.model._default_manager.filter(**{self.owner_field: self.request.user})
+
     def post(self, request):
-        for id, order in self.request_json.items():
-            Module.objects.filter(id=id, course__owner=request.user).update(order=order)
-        return self.render_json_response({'saved':'OK'})
+        orders = read_orders(self.request_json)
+        if orders is None:
+            return self.render_bad_request_response(
+                {'error': 'expected an object of ids to orders'})
+        try:
+            with transaction.atomic():
+                saved = self.get_queryset().reorder(orders)
+                if len(saved) != len(orders):
+                    transaction.set_rollback(True)
+                    return self.render_bad_request_response({'error': 'unknown ids'})
+        except IntegrityError:
+            return self.render_bad_request_response({'error': 'orders must be unique'})
+        return self.render_json_response({'saved':'OK', 'order':sorted(saved, key=saved.get)})
+
+#the subclasses set the model and the lookup of its owner,so get_queryset() keeps the objects
+#of the user and reorder() saves their new orders in one transaction.we send back the ids of
+#the saved objects in their new order.a payload that isnt an object of
+#integer ids to positive integer orders is answered with a 400 before any query.an id the user
+#doesnt own,or that doesnt exist,rolls the whole reorder back with a 400 too,and so does
+#giving two objects of a course or module the same order,which breaks the unique constraint
+
+class ModuleOrderView(OrderView):
+    model = Module
 
 #view to order a module's contents
 
-class ContentOrderView(CsrfExemptMixin,JsonRequestResponseMixin,View):
-    def post(self, request):
-        for id, order in self.request_json.items():
-            Content.objects.filter(id=id,module__course__owner=request.user).update(order=order)
-        return self.render_json_response({'saved':'OK'})
+class ContentOrderView(OrderView):
+    model = Content
+    owner_field = 'module__course__owner'
+
+
+#==chunked uploads for File and Image contents.the client starts an upload,sends the file in
+#chunks with PUT requests carrying a Content-Range header and completes it.every request is
+#short,so a slow upload doesnt hold a worker for the whole transfer.a client that lost its
+#connection asks for the offset with GET and resumes from there
+
+class ChunkedFile(File):
+    def temporary_file_path(self):
+        return self.file.name
+#FileSystemStorage moves a file that has a temporary_file_path() instead of copying it
+
+
+class ChunkedUploadCreateView(CsrfExemptMixin, LoginRequiredMixin, JSONResponseMixin, View):
+    def post(self, request, module_id, model_name):
+        module = get_object_or_404(Module, id=module_id, course__owner=request.user)
+        if model_name not in dict(ChunkedUpload.MODEL_CHOICES):
+            raise Http404
+        form = ChunkedUploadForm(data=request.POST)
+        if not form.is_valid():
+            return self.render_json_response({'errors': form.errors}, status=400)
+        upload = form.save(commit=False)
+        upload.owner = request.user
+        upload.module = module
+        upload.model_name = model_name
+        upload.save()
+        return self.render_json_response({'id': str(upload.id), 'offset': 0}, status=201)
+
+
+class ChunkedUploadView(CsrfExemptMixin, LoginRequiredMixin, JSONResponseMixin, View):
+    content_range = re.compile(r'^bytes (\d+)-(\d+)/(\d+)$')
+
+    def get(self, request, upload_id):
+        upload = get_object_or_404(ChunkedUpload, id=upload_id, owner=request.user)
+        return self.render_json_response({'id': str(upload.id), 'offset': upload.offset,
+                                          'size': upload.size})
+
+    def put(self, request, upload_id):
+        match = self.content_range.match(request.META.get('HTTP_CONTENT_RANGE', ''))
+        if not match:
+            return self.render_json_response({'error': 'Content-Range required'}, status=400)
+        start, end, total = int(match.group(1)), int(match.group(2)) + 1, int(match.group(3))
+        if end <= start:
+            return self.render_json_response({'error': 'invalid Content-Range'}, status=400)
+        max_size = settings.CHUNKED_UPLOAD_MAX_CHUNK_SIZE
+        with transaction.atomic():
+            #the lock keeps two requests from writing the same upload at once
+            upload = get_object_or_404(ChunkedUpload.objects.select_for_update(),
+                                       id=upload_id, owner=request.user)
+            if (start != upload.offset or end > upload.size or total != upload.size or
+                    end - start > max_size):
+                return self.render_json_response({'error': 'unexpected range',
+                                                  'offset': upload.offset}, status=409)
+            os.makedirs(os.path.dirname(upload.path), exist_ok=True)
+            with open(upload.path, 'r+b' if start else 'wb') as f:
+                f.seek(start)
+                remaining = end - start
+                while remaining:
+                    chunk = request.read(min(remaining, 64 * 1024))
+                    if not chunk:
+                        break
+                    f.write(chunk)
+                    remaining -= len(chunk)
+                f.truncate()
+                upload.offset = f.tell()
+            upload.save(update_fields=['offset'])
+        return self.render_json_response({'id': str(upload.id), 'offset': upload.offset})
+    #JSONResponseMixin doesnt parse the body,we read it in small pieces from the request stream
+    #and write them at the current offset,so memory stays bounded whatever the chunk size.a
+    #chunk that arrives incomplete only moves the offset as far as the bytes received
+
+
+class ChunkedUploadCompleteView(CsrfExemptMixin, LoginRequiredMixin, JSONResponseMixin, View):
+    def post(self, request, upload_id):
+        with transaction.atomic():
+            #the lock makes a second complete of the same upload wait for this one,then it
+            #finds the upload deleted and gets a 404 instead of creating the item again
+            upload = get_object_or_404(ChunkedUpload.objects.select_for_update(),
+                                       id=upload_id, owner=request.user)
+            if upload.offset != upload.size:
+                return self.render_json_response({'error': 'upload incomplete',
+                                                  'offset': upload.offset}, status=409)
+            digest = hashlib.sha256()
+            with open(upload.path, 'rb') as f:
+                for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                    digest.update(chunk)
+            if upload.sha256 and digest.hexdigest() != upload.sha256.lower():
+                upload.delete()
+                return self.render_json_response({'error': 'checksum mismatch'}, status=400)
+
+            model = apps.get_model(app_label='courses', model_name=upload.model_name)
+            obj = model(owner=request.user, title=upload.title)
+            with open(upload.path, 'rb') as f:
+                chunked = ChunkedFile(f)
+                #the hashed storage names the file by this checksum instead of reading it again
+                chunked.sha256 = digest.hexdigest()
+                obj.file.save(upload.filename, chunked, save=False)
+            obj.save()
+            content = Content.objects.create(module=upload.module, item=obj)
+            upload.delete()
+        return self.render_json_response({'id': obj.id, 'content': content.id,
+                                          'sha256': digest.hexdigest()}, status=201)
+    #only now we create the item and its Content,the same way ContentCreateUpdateView does.
+    #a failed checksum discards the upload,the client has to start again
 
 
 #here we are to create public views for displaying course info
@@ -275,19 +456,27 @@ class ContentOrderView(CsrfExemptMixin,JsonRequestResponseMixin,View):
 #==course catalog => list all available courses,optionally filtered by subject,display
 #==asingle course overview
 
-class CourseListView(TemplateResponseMixin, View):
+class CourseListView(AsyncViewMixin, TemplateResponseMixin, View):
+    read_from_replica = True
     model = Course
     template_name = 'courses/course/list.html'
 
-    def get(self,request, subject=None):
-        subjects = Subject.objects.annotate(total_courses=Count('courses'))
-        courses = Course.objects.annotate(total_modules=Count('modules'))
-
+    async def get(self,request, subject=None):
         if subject:
-            subject = get_object_or_404(Subject, slug=subject)
-            courses = courses.filter(subject=subject)
+            subjects = await query(catalog.get_subjects)
+            subject = next((s for s in subjects if s.slug == subject), None)
+            if subject is None:
+                raise Http404('No Subject matches the given query.')
+            courses = await query(catalog.get_courses, subject.id)
+        else:
+            subjects, courses = await asyncio.gather(query(catalog.get_subjects),
+                                                     query(catalog.get_courses))
         return self.render_to_response({'subjects':subjects,
             'subject':subject,'courses':courses})
+    #the subjects and courses come from the catalog cache,see catalog.py.we look the subject
+    #up in the cached subjects too,so a cached page runs no query at all.the view is async:
+    #without a subject the subjects and the courses are read at the same time,with one we
+    #need the id of the subject first
     #here we retrieve all subjects,including the total number of courses for each of them
     #we use the ORM's annotate mthd with the Count() aggregation function to include
     #the total number of courses for each subject
@@ -298,15 +487,38 @@ class CourseListView(TemplateResponseMixin, View):
     #we use the render_to_respone mthd provided by TemplateResponseMixin to render the
     #objects to atemplate and return an HTTP response
 
-class CourseDetailView(DetailView):
+class CourseDetailView(AsyncViewMixin, TemplateResponseMixin, View):
+    read_from_replica = True
     model =Course
     template_name = 'courses/course/detail.html'
 
-    def get_context_data(self, **kwargs):
-        context = super(CourseDetailView,self).get_context_data(**kwargs)
-        context['enroll_form'] = CourseEnrollForm(initial={'course':self.object})
-        return context
-
-#we use the get_context_data() mthd to include the enrollment form in the context for rendering
-#the templates,we initialize the hidden course field of the from with the current Course object
-#so that it can be submitted direclty.
\ No newline at end of file
+    async def get(self, request, slug):
+        course, user_id = await asyncio.gather(
+            query(get_object_or_404, Course.objects.select_related('subject', 'owner'), slug=slug),
+            query(lambda: request.user.pk))
+        #the page shows an enroll form with a CSRF token to a user and a register link to a
+        #visitor,so the ETag differs per user
+        etag = course_etag(course, variant=user_id or '', weak=True)
+        modified = last_modified(course)
+        response = not_modified(request, etag, modified)
+        if response is None:
+            response = self.render_to_response({'object':course, 'course':course,
+                'enroll_form':CourseEnrollForm(initial={'course':course})})
+        return set_validators(response, etag, modified)
+
+#we include the enrollment form in the context for rendering the templates,we initialize the
+#hidden course field of the from with the current Course object so that it can be submitted
+#direclty.the subject and owner shown on the page come with the course in one query.a browser
+#that has the current page gets a 304 without rendering it,see conditional.py
+
+
+#==search.the results come from the full text index in search.py,ranked by relevance
+
+class CourseSearchView(TemplateResponseMixin, View):
+    read_from_replica = True
+    template_name = 'courses/course/search.html'
+
+    def get(self, request):
+        query = request.GET.get('q', '')
+        results = search.search(query)
+        return self.render_to_response({'query': query, 'results': results})
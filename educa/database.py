@@ -0,0 +1,74 @@
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured, MiddlewareNotUsed
+from django.db import DatabaseError, connections
+
+from .middleware import AsyncCapableMiddleware
+
+#DatabaseConnectionMiddleware takes care of reused database connections.when the server loads
+#it validates the CONN_MAX_AGE and POOL settings of every database and,with
+#DATABASE_CHECK_ON_STARTUP,connects to each of them,so a worker with a wrong configuration fails
+#to start instead of failing its requests.for the databases with CONN_HEALTH_CHECKS it checks a
+#persistent connection at the start of every request and drops it when the server closed it
+#while it was idle,so the request connects again instead of failing on its first query.django
+#4.1 does the same check itself for CONN_HEALTH_CHECKS.under ASGI the sync views run in the
+#single sync thread of django,the check runs there too.the threads that run the queries of the
+#async views drop a connection after a query on it failed,see courses/asynchronous.py
+
+POOL_ENGINE = 'educa.postgresql_pool'
+
+
+def validate_database(alias, settings_dict):
+    max_age = settings_dict.get('CONN_MAX_AGE', 0)
+    if max_age is not None and (not isinstance(max_age, int) or max_age < 0):
+        raise ImproperlyConfigured(
+            "DATABASES['{}']['CONN_MAX_AGE'] must be None or a number of seconds, "
+            "got {!r}".format(alias, max_age))
+    pool = settings_dict.get('POOL')
+    if not pool:
+        return
+    if settings_dict['ENGINE'] != POOL_ENGINE:
+        raise ImproperlyConfigured(
+            "DATABASES['{}']['POOL'] needs ENGINE '{}'".format(alias, POOL_ENGINE))
+    if max_age != 0:
+        raise ImproperlyConfigured(
+            "DATABASES['{}'] uses a pool, CONN_MAX_AGE must be 0 so the connection goes "
+            "back to the pool after every request".format(alias))
+    if not 0 <= pool.get('MIN', 1) <= pool.get('MAX', 10) or pool.get('MAX', 10) < 1:
+        raise ImproperlyConfigured(
+            "DATABASES['{}']['POOL'] needs 0 <= MIN <= MAX and MAX >= 1".format(alias))
+
+
+class DatabaseConnectionMiddleware(AsyncCapableMiddleware):
+    def __init__(self, get_response):
+        for alias in connections:
+            validate_database(alias, connections[alias].settings_dict)
+        if getattr(settings, 'DATABASE_CHECK_ON_STARTUP', False):
+            for alias in connections:
+                try:
+                    connections[alias].ensure_connection()
+                except DatabaseError as e:
+                    raise ImproperlyConfigured(
+                        "can't connect to database '{}': {}".format(alias, e))
+                finally:
+                    connections[alias].close()
+        self.aliases = [alias for alias in connections
+                        if connections[alias].settings_dict.get('CONN_HEALTH_CHECKS')
+                        and connections[alias].settings_dict.get('CONN_MAX_AGE') != 0]
+        if not self.aliases:
+            raise MiddlewareNotUsed
+        super(DatabaseConnectionMiddleware, self).__init__(get_response)
+
+    def call(self, request):
+        self.check_connections()
+        return self.get_response(request)
+
+    async def acall(self, request):
+        await sync_to_async(self.check_connections, thread_sensitive=True)()
+        return await self.get_response(request)
+
+    def check_connections(self):
+        for alias in self.aliases:
+            connection = connections[alias]
+            if connection.connection is not None and not connection.is_usable():
+                connection.close()
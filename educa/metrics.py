@@ -0,0 +1,197 @@
+import logging
+import socket
+import threading
+import time
+from collections import Counter, deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.utils.module_loading import import_string
+
+from .middleware import AsyncCapableMiddleware
+
+logger = logging.getLogger('educa.metrics')
+
+#RequestMetricsMiddleware measures where the time of every request goes:the total time,the
+#number and time of the SQL queries,the template rendering time and the view that handled it.
+#the numbers are sent back in a Server-Timing header and handed to the sinks listed in the
+#REQUEST_METRICS_SINKS setting.when REQUEST_METRICS_ENABLED is False the middleware raises
+#MiddlewareNotUsed,so django leaves it out of the chain and it costs nothing.the recorder of the
+#request is kept in a context variable,so the queries an async view runs in other threads are
+#counted too
+
+
+class LogSink(object):
+    def __call__(self, metrics):
+        logger.info('%(method)s %(path)s %(status)s view=%(view)s total=%(total_ms).1fms '
+                    'sql=%(sql_ms).1fms/%(queries)d template=%(template_ms).1fms', metrics)
+
+
+class RingBufferSink(object):
+    #keeps the metrics of the last requests of this process in memory
+    buffer = deque(maxlen=getattr(settings, 'REQUEST_METRICS_BUFFER_SIZE', 1000))
+
+    def __call__(self, metrics):
+        self.buffer.append(metrics)
+
+
+class StatsdSink(object):
+    def __init__(self):
+        host, port = getattr(settings, 'REQUEST_METRICS_STATSD', ('127.0.0.1', 8125))
+        self.address = (host, port)
+        self.prefix = getattr(settings, 'REQUEST_METRICS_STATSD_PREFIX', 'educa')
+        self.socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+
+    def __call__(self, metrics):
+        name = '{}.{}'.format(self.prefix, metrics['view'])
+        lines = [
+            '{}.total:{:.3f}|ms'.format(name, metrics['total_ms']),
+            '{}.sql:{:.3f}|ms'.format(name, metrics['sql_ms']),
+            '{}.template:{:.3f}|ms'.format(name, metrics['template_ms']),
+            '{}.queries:{}|h'.format(name, metrics['queries']),
+        ]
+        try:
+            self.socket.sendto('\n'.join(lines).encode(), self.address)
+        except OSError:
+            #metrics are best effort,a missing statsd daemon must not break requests
+            pass
+
+
+class QueryRecorder(object):
+    #counts the queries of one request,the queries of an async view can run at the same time.
+    #a recorder started inside another one,like the one of a request inside recording(),counts
+    #its queries in both
+    def __init__(self, parent=None):
+        self.count = 0
+        self.time = 0.0
+        self.statements = Counter()
+        self.lock = threading.Lock()
+        self.parent = parent
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.add(sql, time.perf_counter() - start)
+
+    def add(self, sql, elapsed):
+        with self.lock:
+            self.time += elapsed
+            self.count += 1
+            self.statements[sql] += 1
+        if self.parent is not None:
+            self.parent.add(sql, elapsed)
+
+
+_recorder = ContextVar('educa_metrics_recorder', default=None)
+
+
+def record_query(execute, sql, params, many, context):
+    #execute wrapper installed on every database connection,outside of a request it does nothing
+    recorder = _recorder.get()
+    if recorder is None:
+        return execute(sql, params, many, context)
+    return recorder(execute, sql, params, many, context)
+
+
+def install_recorder(sender, connection, **kwargs):
+    #connection_created is sent again every time a connection is opened
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+@contextmanager
+def recording():
+    #counts the queries run in the block by every thread it hands work to,the query threads of
+    #the async views too.CaptureQueriesContext only sees the connection of the current thread
+    connection_created.connect(install_recorder)
+    for connection in connections.all():
+        install_recorder(None, connection)
+    recorder = QueryRecorder()
+    token = _recorder.set(recorder)
+    try:
+        yield recorder
+    finally:
+        _recorder.reset(token)
+
+
+class RequestMetricsMiddleware(AsyncCapableMiddleware):
+    def __init__(self, get_response):
+        if not getattr(settings, 'REQUEST_METRICS_ENABLED', False):
+            raise MiddlewareNotUsed
+        super(RequestMetricsMiddleware, self).__init__(get_response)
+        connection_created.connect(install_recorder)
+        self.sinks = [import_string(path)() for path in
+                      getattr(settings, 'REQUEST_METRICS_SINKS', ['educa.metrics.LogSink'])]
+        self.duplicate_threshold = getattr(settings, 'REQUEST_METRICS_DUPLICATE_THRESHOLD', 3)
+
+    def call(self, request):
+        recorder, token, start = self.start(request)
+        try:
+            response = self.get_response(request)
+        finally:
+            _recorder.reset(token)
+        return self.finish(request, response, recorder, start)
+
+    async def acall(self, request):
+        recorder, token, start = self.start(request)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _recorder.reset(token)
+        return self.finish(request, response, recorder, start)
+
+    def start(self, request):
+        request._metrics_view = None
+        request._metrics_template = 0.0
+        recorder = QueryRecorder(parent=_recorder.get())
+        return recorder, _recorder.set(recorder), time.perf_counter()
+
+    def finish(self, request, response, recorder, start):
+        total = time.perf_counter() - start
+
+        metrics = {
+            'method': request.method,
+            'path': request.path,
+            'status': response.status_code,
+            'view': request._metrics_view or '-',
+            'total_ms': total * 1000,
+            'sql_ms': recorder.time * 1000,
+            'queries': recorder.count,
+            'template_ms': request._metrics_template * 1000,
+            'duplicates': {sql: count for sql, count in recorder.statements.items()
+                           if count >= self.duplicate_threshold},
+        }
+        if metrics['duplicates']:
+            #the same statement run again and again in one request is usually an N+1
+            logger.warning('%s ran %d duplicated queries: %s', metrics['view'],
+                           sum(metrics['duplicates'].values()),
+                           '; '.join(metrics['duplicates']))
+        response['Server-Timing'] = ', '.join([
+            'total;dur={:.1f}'.format(metrics['total_ms']),
+            'sql;dur={:.1f};desc="{} queries"'.format(metrics['sql_ms'], metrics['queries']),
+            'template;dur={:.1f}'.format(metrics['template_ms']),
+        ])
+        for sink in self.sinks:
+            sink(metrics)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        view = getattr(view_func, 'view_class', view_func)
+        request._metrics_view = getattr(view, '__qualname__', view.__class__.__name__)
+
+    def process_template_response(self, request, response):
+        #this is the last hook before the template response is rendered,the post render
+        #callback runs right after rendering
+        start = time.perf_counter()
+
+        def rendered(response):
+            request._metrics_template += time.perf_counter() - start
+
+        response.add_post_render_callback(rendered)
+        return response
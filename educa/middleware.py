@@ -0,0 +1,29 @@
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+
+#base of the educa middlewares,they run in the sync chain of WSGI and in the async chain of
+#ASGI like the middlewares of django itself.with one sync only middleware in the chain django
+#runs the whole request under ASGI,async views too,in its single sync thread,so the worker
+#would serve one request at a time.subclasses write the sync version in call() and the async
+#one in acall()
+
+
+class AsyncCapableMiddleware(object):
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            #django checks this to await the middleware,the same mark MiddlewareMixin sets
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self.get_response):
+            return self.acall(request)
+        return self.call(request)
+
+    def call(self, request):
+        return self.get_response(request)
+
+    async def acall(self, request):
+        return await self.get_response(request)
@@ -0,0 +1,56 @@
+import os
+import threading
+
+import psycopg2.extras
+import psycopg2.pool
+from django.db.backends.postgresql import base
+
+#the PostgreSQL backend with an in-process connection pool.set ENGINE to 'educa.postgresql_pool'
+#and add POOL to the database settings:
+#   'POOL': {'MIN': 2, 'MAX': 20},
+#django closes the connection at the end of every request when CONN_MAX_AGE is 0,this backend
+#gives it back to the pool instead,so the next request of any thread of the process reuses it.
+#MAX has to cover the threads of a worker process,a thread that finds the pool exhausted gets a
+#PoolError.without POOL the backend connects and closes like the stock one
+
+_pools = {}
+_lock = threading.Lock()
+
+
+def get_pool(alias, conn_params, options):
+    #the pool belongs to the process,a worker forked with a pool gets a new one
+    key = (alias, os.getpid())
+    with _lock:
+        if key not in _pools:
+            _pools[key] = psycopg2.pool.ThreadedConnectionPool(
+                options.get('MIN', 1), options.get('MAX', 10), **conn_params)
+        return _pools[key]
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    def get_new_connection(self, conn_params):
+        options = self.settings_dict.get('POOL')
+        if not options:
+            return super(DatabaseWrapper, self).get_new_connection(conn_params)
+        connection = get_pool(self.alias, conn_params, options).getconn()
+        #the same set up as the stock backend,see django.db.backends.postgresql.base
+        options = self.settings_dict['OPTIONS']
+        try:
+            self.isolation_level = options['isolation_level']
+        except KeyError:
+            self.isolation_level = connection.isolation_level
+        else:
+            if self.isolation_level != connection.isolation_level:
+                connection.set_session(isolation_level=self.isolation_level)
+        psycopg2.extras.register_default_jsonb(conn_or_curs=connection, loads=lambda x: x)
+        return connection
+
+    def _close(self):
+        pool = _pools.get((self.alias, os.getpid()))
+        if self.connection is None or pool is None or not self.settings_dict.get('POOL'):
+            return super(DatabaseWrapper, self)._close()
+        #a connection that failed is dropped,the pool rolls back an open transaction of the
+        #others before lending them again
+        broken = self.errors_occurred and not self.is_usable()
+        with self.wrap_database_errors:
+            pool.putconn(self.connection, close=broken)
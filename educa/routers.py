@@ -0,0 +1,96 @@
+import random
+import time
+
+from asgiref.local import Local
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+
+from .middleware import AsyncCapableMiddleware
+
+#ReplicaRouter sends the reads of the views that opted in with read_from_replica = True to one
+#of the databases listed in DATABASE_REPLICAS,everything else uses the primary(default).
+#ReplicaRoutingMiddleware decides per request:only GET and HEAD requests of those views read
+#from a replica,and once anything is written the rest of the request reads from the primary.
+#a response to a request that wrote sets a short lived cookie,so the requests that follow it
+#from the same browser read their own writes while the replicas catch up.outside of a request
+#(management commands,background threads) every query goes to the primary
+
+PRIMARY = 'default'
+PIN_COOKIE = 'replica_pin'
+
+_state = Local()
+
+
+def get_replicas():
+    return getattr(settings, 'DATABASE_REPLICAS', [])
+
+
+class ReplicaRouter(object):
+    def db_for_read(self, model, **hints):
+        replica = getattr(_state, 'replica', None)
+        if replica and not getattr(_state, 'written', False):
+            return replica
+        #an explicit answer,an object read from a replica must not send its related
+        #lookups there after a write
+        return PRIMARY
+
+    def db_for_write(self, model, **hints):
+        _state.written = True
+        return PRIMARY
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = [PRIMARY] + get_replicas()
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        #the replicas get the schema through replication
+        return db not in get_replicas()
+
+
+class ReplicaRoutingMiddleware(AsyncCapableMiddleware):
+    #under ASGI the state lives in the context of the request,the threads that run the queries
+    #of an async view get a copy of it and give the written flag back
+    def __init__(self, get_response):
+        if not get_replicas():
+            raise MiddlewareNotUsed
+        super(ReplicaRoutingMiddleware, self).__init__(get_response)
+        self.pin_seconds = getattr(settings, 'DATABASE_REPLICA_PIN_SECONDS', 5)
+
+    def call(self, request):
+        self.reset()
+        try:
+            return self.pin(self.get_response(request))
+        finally:
+            self.reset()
+
+    async def acall(self, request):
+        self.reset()
+        try:
+            return self.pin(await self.get_response(request))
+        finally:
+            self.reset()
+
+    def reset(self):
+        _state.replica = None
+        _state.written = False
+
+    def pin(self, response):
+        if _state.written:
+            response.set_cookie(PIN_COOKIE, str(int(time.time()) + self.pin_seconds),
+                                max_age=self.pin_seconds, httponly=True, samesite='Lax')
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        view = getattr(view_func, 'view_class', None) or getattr(view_func, 'cls', None)
+        if (request.method in ('GET', 'HEAD') and not self.pinned(request)
+                and getattr(view, 'read_from_replica', False)):
+            #one replica for the whole request,so all of its reads see the same data
+            _state.replica = random.choice(get_replicas())
+
+    def pinned(self, request):
+        try:
+            return int(request.COOKIES.get(PIN_COOKIE, 0)) > time.time()
+        except ValueError:
+            return False
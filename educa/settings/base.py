@@ -45,11 +45,15 @@ INSTALLED_APPS = [
     'django.contrib.messages',
     'django.contrib.staticfiles',
     'rest_framework',
-    'courses',
+    'rest_framework.authtoken',
+    'courses.apps.CoursesConfig',
     'students',
 ]
 
 MIDDLEWARE = [
+    'educa.metrics.RequestMetricsMiddleware',
+    'educa.routers.ReplicaRoutingMiddleware',
+    'educa.database.DatabaseConnectionMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -59,6 +63,12 @@ MIDDLEWARE = [
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
+#per request timing and SQL metrics,see educa/metrics.py.the middleware takes itself out of the
+#chain when it is not enabled
+REQUEST_METRICS_ENABLED = False
+REQUEST_METRICS_SINKS = ['educa.metrics.LogSink']
+REQUEST_METRICS_DUPLICATE_THRESHOLD = 3
+
 ROOT_URLCONF = 'educa.urls'
 
 TEMPLATES = [
@@ -91,6 +101,21 @@ WSGI_APPLICATION = 'educa.wsgi.application'
 # }
 #===moved to local.py
 
+#read replicas are aliases of DATABASES listed in DATABASE_REPLICAS.the public,student and
+#read-only API views read from them,see educa/routers.py.without replicas the router sends
+#everything to default and the middleware takes itself out of the chain
+DATABASE_ROUTERS = ['educa.routers.ReplicaRouter']
+DATABASE_REPLICAS = []
+#how long the requests that follow a write keep reading from the primary,it should be longer
+#than the replication lag
+DATABASE_REPLICA_PIN_SECONDS = 5
+#connect to every database when the server loads,see educa/database.py
+DATABASE_CHECK_ON_STARTUP = False
+#threads the async views run their queries in,see courses/asynchronous.py.it limits how many
+#queries of one worker run at the same time.every thread keeps a connection,each worker process
+#can open this many connections on top of its request threads,see pro.py
+ASYNC_QUERY_THREADS = 32
+
 # Password validation
 # https://docs.djangoproject.com/en/3.0/ref/settings/#auth-password-validators
 
@@ -125,9 +150,58 @@ USE_TZ = True
 
 REST_FRAMEWORK = {
     'DEFAULT_PERMISSION_CLASSES':[
-        'rest_framework.permissions.DjangoModelPermissionsOrAnonReadOnly']
+        'rest_framework.permissions.DjangoModelPermissionsOrAnonReadOnly'],
+    'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
+    'PAGE_SIZE': 20,
+}
+
+API_MAX_PAGE_SIZE = 100
+#users enrolled by one request to the bulk enrollment endpoint
+API_MAX_BULK_ENROLL = 5000
+#API tokens verified in the last API_TOKEN_CACHE_SECONDS are accepted without a query.a revoked
+#token stops working in every process at once,through a version in the cache framework,but a
+#deactivated user keeps access that long,see courses/api/authentication.py
+API_TOKEN_CACHE_SECONDS = 60
+API_TOKEN_CACHE_SIZE = 10000
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    }
 }
+#a per process cache for development and tests,pro.py uses memcached so all the workers share
+#the same cache and see the catalog invalidations
+
+CATALOG_CACHE_TIMEOUT = 60 * 60
+
 # Static files (CSS, JavaScript, Images)
 # https://docs.djangoproject.com/en/3.0/howto/static-files/
 
 STATIC_URL = '/static/'
+
+MEDIA_URL = '/media/'
+MEDIA_ROOT = os.path.join(BASE_DIR, 'media/')
+
+#partial files of chunked uploads,outside MEDIA_ROOT so they are never served
+CHUNKED_UPLOAD_ROOT = os.path.join(BASE_DIR, 'uploads/')
+CHUNKED_UPLOAD_MAX_CHUNK_SIZE = 8 * 1024 * 1024
+#the files of File and Image items are stored by content and shared by identical uploads.a file
+#stored again in the last seconds isnt deleted,the upload may not be committed yet,see
+#courses/storage.py
+HASHED_STORAGE_GRACE_SECONDS = 600
+#the files of items are served by students/item/.../file/ after checking the enrollment.None
+#sends them from django,'x-accel-redirect' lets nginx send them from the internal location
+#SENDFILE_URL,'x-sendfile' lets apache send them from their path,see courses/sendfile.py
+SENDFILE_BACKEND = None
+SENDFILE_URL = '/protected/'
+
+#resized variants generated for Image contents,see courses/media.py.the executor can be
+#'process' or 'thread'
+IMAGE_VARIANTS = {
+    'thumbnail': (200, 200),
+    'medium': (800, 800),
+    'large': (1600, 1600),
+}
+IMAGE_DISPLAY_VARIANT = 'large'
+IMAGE_PROCESSING_EXECUTOR = 'process'
+IMAGE_PROCESSING_WORKERS = 2
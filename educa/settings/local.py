@@ -5,4 +5,7 @@ DATABASES = {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
     }
-}
\ No newline at end of file
+}
+
+REQUEST_METRICS_ENABLED = True
+REQUEST_METRICS_SINKS = ['educa.metrics.LogSink', 'educa.metrics.RingBufferSink']
@@ -17,6 +17,57 @@ DATABASES = {
         'USER':'admin',
         'PASSWORD':'admin5194',
         'HOST':'localhost',
-        'PORT':'5432'
+        'PORT':'5432',
+        'CONN_MAX_AGE': 60,
+        'CONN_HEALTH_CHECKS': True,
+    },
+    # 'replica': {
+    #     'ENGINE':'django.db.backends.postgresql_psycopg2',
+    #     'NAME':'education',
+    #     'USER':'admin',
+    #     'PASSWORD':'admin5194',
+    #     'HOST':'replica.localhost',
+    #     'PORT':'5432',
+    #     'CONN_MAX_AGE': 60,
+    #     'CONN_HEALTH_CHECKS': True,
+    #     'TEST': {'MIRROR': 'default'},
+    # },
+}
+
+#the connection of a worker thread is kept for CONN_MAX_AGE seconds and reused by its next
+#requests,instead of connecting on every request.CONN_HEALTH_CHECKS drops a kept connection the
+#server closed while it was idle.to share a pool of connections between the threads of a
+#worker use the pooling backend instead,with CONN_MAX_AGE 0:
+#   'ENGINE': 'educa.postgresql_pool',
+#   'POOL': {'MIN': 2, 'MAX': 20},
+#   'CONN_MAX_AGE': 0,
+#python manage.py bench_connections compares the latency of both against no reuse
+DATABASE_CHECK_ON_STARTUP = True
+
+#the async views run their queries in a pool of ASYNC_QUERY_THREADS threads per worker process,
+#under uwsgi(WSGI) too.every thread keeps its own connection for CONN_MAX_AGE,so a worker can
+#hold its request threads plus this many connections to every database it reads from:
+#processes * (threads + ASYNC_QUERY_THREADS) has to stay below max_connections of postgres
+ASYNC_QUERY_THREADS = 8
+
+#add every replica to DATABASES and list its alias here.TEST MIRROR makes the tests read the
+#test database of default through the replica alias
+DATABASE_REPLICAS = []
+
+#nginx sends the files of items once the view allowed them,the worker doesnt wait for the
+#download.the location is internal,a client cant request it:
+#   location /protected/ {
+#       internal;
+#       alias /path/to/educa/media/;
+#   }
+SENDFILE_BACKEND = 'x-accel-redirect'
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.memcached.PyMemcacheCache',
+        'LOCATION': '127.0.0.1:11211',
     }
-}
\ No newline at end of file
+}
+#the PyMemcacheCache backend needs the pymemcache client(pip install "pymemcache>=3.4",the
+#oldest django 3.2 supports),next to psycopg2 for the database.django imports it on the first
+#cache access,so without it the first request fails,not the start of the server
@@ -0,0 +1,13 @@
+from .local import *
+
+#local stand in for a primary with a read replica,two SQLite files.the replica is refreshed
+#by copying the primary:
+#   sqlite3 db.sqlite3 ".backup db_replica.sqlite3"
+#run with --settings=educa.settings.replica.changes show up on the replica pages only after
+#the next copy,unless the browser wrote something in the last DATABASE_REPLICA_PIN_SECONDS
+DATABASES['replica'] = {
+    'ENGINE': 'django.db.backends.sqlite3',
+    'NAME': os.path.join(BASE_DIR, 'db_replica.sqlite3'),
+    'TEST': {'MIRROR': 'default'},
+}
+DATABASE_REPLICAS = ['replica']
@@ -4,4 +4,10 @@ from . import views
 urlpatterns = [
     path('register/',views.StudentRegistrationView.as_view(),name='student_registration'),
     path('enroll-course/',views.StudentEnrollCourseView.as_view(),name='student_enroll_course'),
+    path('courses/',views.StudentCourseListView.as_view(),name='student_course_list'),
+    path('course/<int:pk>/',views.StudentCourseDetailView.as_view(),name='student_course_detail'),
+    path('course/<int:pk>/<int:module_id>/',views.StudentCourseDetailView.as_view(),
+        name='student_course_detail_module'),
+    path('item/<model_name>/<int:pk>/file/',views.StudentItemFileView.as_view(),
+        name='student_item_file'),
 ]
\ No newline at end of file
@@ -1,14 +1,25 @@
+import os
+
 import students
-from django.shortcuts import render
+from django.shortcuts import render, get_object_or_404
 from django.urls import reverse_lazy
 from django.views.generic.edit import CreateView,FormView
 from django.views.generic.list import ListView
 from django.views.generic.detail import DetailView
+from django.views.generic.base import View
+from django.contrib.contenttypes.models import ContentType
+from django.db.models import Exists, OuterRef, Q
+from django.http import Http404
 from django.contrib.auth.forms import UserCreationForm
 from django.contrib.auth import authenticate, login
 from django.contrib.auth.mixins import LoginRequiredMixin
 from .forms import CourseEnrollForm
-from courses.models import Course
+from courses.conditional import (VALIDATOR_FIELDS, course_etag, last_modified, not_modified,
+                                 set_validators)
+from courses.enrollment import enroll, enrolled_course_ids
+from courses.models import Content, Course, File, Image, ImageVariant
+from courses.sendfile import serve_file
+from courses.versions import course_version, module_version
 
 class StudentRegistrationView(CreateView):
     template_name = 'students/student/registration.html'
@@ -35,21 +46,22 @@ class StudentEnrollCourseView(LoginRequiredMixin, FormView):
 
     def form_valid(self, form):
         self.course = form.cleaned_data['course']
-        self.course.students.add(self.request.user)
+        enroll(self.request.user, self.course)
         return super(StudentEnrollCourseView, self).form_valid(form)
 
     def get_success_url(self):
         return reverse_lazy('student_course_detail',args=[self.course.id])
 
 class StudentCourseListView(LoginRequiredMixin,ListView):
+    read_from_replica = True
     model = Course
     template_name = 'students/course/list.html'
 
-    def get_queyset(self):
+    def get_queryset(self):
         qs = super(StudentCourseListView,self).get_queryset()
-        return qs.filter(students__in=[self.request.user])
+        return qs.filter(id__in=enrolled_course_ids(self.request.user))
     #override the get_queryset() mthd for retrieving only the courses the user is enrolled in
-    #;we filter the QUeryset by the student's ManyToManyField field for doing so
+    #;we filter the QUeryset by the ids of the courses the student is enrolled in,which are cached
 
 class StudentCourseDetailView(DetailView):
     model = Course
@@ -57,12 +69,69 @@ class StudentCourseDetailView(DetailView):
 
     def get_queryset(self):
         qs = super(StudentCourseDetailView, self).get_queryset()
-        return qs.filter(students__in=[self.request.user])
-    
+        return qs.filter(id__in=enrolled_course_ids(self.request.user))
+
+    def get(self, request, *args, **kwargs):
+        course = get_object_or_404(self.get_queryset().only(*VALIDATOR_FIELDS), pk=kwargs['pk'])
+        etag, modified = course_etag(course, weak=True), last_modified(course)
+        response = not_modified(request, etag, modified)
+        if response is None:
+            response = super(StudentCourseDetailView, self).get(request, *args, **kwargs)
+        return set_validators(response, etag, modified)
+    #the course version covers all of its modules,so a student who comes back to a page that
+    #didnt change gets a 304 after one query for the validators,see courses/conditional.py
+
     def get_context_data(self, **kwargs):
         context = super(StudentCourseDetailView, self).get_context_data(**kwargs)
         #get course object
-        course = self.get_object()
+        course = self.object
         if 'module_id' in self.kwargs:
             #get current module
-            context['module'] = course.modules.get(id=self.kwargs['module_id'])
\ No newline at end of file
+            context['module'] = get_object_or_404(course.modules, id=self.kwargs['module_id'])
+        else:
+            #get first module
+            context['module'] = course.modules.first()
+        context['course_version'] = course_version(course.id)
+        if context['module']:
+            context['module_version'] = module_version(context['module'].id)
+        return context
+    #a module of another course,or one that doesnt exist,is a 404 like a course the student
+    #isnt enrolled in.the template renders every content with item.render,which is cached per
+    #item.the module list and the module contents are cached as fragments shared by all
+    #students,keyed by the course and module versions.the view reads from the primary:a fragment
+    #rendered from a replica that missed the change behind a version bump would be kept until
+    #the next bump
+
+class StudentItemFileView(LoginRequiredMixin, View):
+    models = {'file': File, 'image': Image}
+
+    def get_file(self, model, pk, variant=None):
+        if variant:
+            rows, item = ImageVariant.objects.filter(image_id=pk, name=variant), 'image_id'
+        else:
+            rows, item = model.objects.filter(pk=pk), 'pk'
+        user = self.request.user
+        contents = Content.objects.filter(
+            content_type=ContentType.objects.get_for_model(model), object_id=OuterRef(item))
+        #the item is in a course the user is a student of or teaches,each an EXISTS on indexed
+        #columns,in the same query that reads the name of the file
+        rows = rows.filter(Q(Exists(contents.filter(module__course__students=user))) |
+                           Q(Exists(contents.filter(module__course__owner=user))))
+        title = 'image__title' if variant else 'title'
+        return rows.values_list('file', title).first()
+
+    def get(self, request, model_name, pk):
+        model = self.models.get(model_name)
+        variant = request.GET.get('variant') if model is Image else None
+        row = self.get_file(model, pk, variant) if model else None
+        if row is None:
+            raise Http404('no file')
+        name, title = row
+        field = (ImageVariant if variant else model)._meta.get_field('file')
+        #the title of the item,with the extension of the file,is the name it is downloaded as
+        filename = title + os.path.splitext(name)[1]
+        return serve_file(request, field.storage, name, filename,
+                          attachment=model is File)
+#the files of File and Image items are served only to the students of their courses and to
+#their instructors,instead of from MEDIA_URL to anyone with the link.the view checks the
+#access with one query and hands the file to the web server,see courses/sendfile.py